@@ -0,0 +1,29 @@
+import argparse
+import os
+from helpers.mp3_utils import audit_library
+from helpers.manifest_utils import load_manifest, recorded_durations
+from helpers.cache_utils import get_info_cache
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check every MP3 in a library for truncation or corruption",
+        epilog="Durations are checked for files whose link is in the folder's sync manifest and whose "
+               "duration is in the info cache; other files only get the structural check.")
+    parser.add_argument("folder", nargs="?", default=os.path.expanduser("~/Documents/Music/Stock"),
+                        help="Library folder (default: ~/Documents/Music/Stock)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--remove-bad", action="store_true",
+                        help="Delete files that fail so the next download run fetches them again")
+    parser.add_argument("--structure-only", action="store_true",
+                        help="Skip the duration check and only walk the frames")
+    args = parser.parse_args()
+
+    expected_durations = None
+    if not args.structure_only:
+        expected_durations = recorded_durations(load_manifest(args.folder), get_info_cache().cached_duration)
+
+    audit_library(args.folder, expected_durations, max_workers=args.workers, remove_bad=args.remove_bad,
+                  log=lambda msg: print(msg, end=""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import argparse
+import os
+from helpers.schedule_utils import POLICIES, run_schedule
+
+def parse_priorities(values):
+    """Turn ['Music.xlsx=0', 'Party.xlsx=2'] into {path: priority}"""
+    priorities = {}
+    for value in values or []:
+        path, _, priority = value.rpartition("=")
+        priorities[path] = int(priority)
+    return priorities
+
+def main():
+    parser = argparse.ArgumentParser(description="Download many playlist workbooks on one shared worker pool")
+    parser.add_argument("paths", nargs="+", help="Excel files and/or folders of Excel files")
+    parser.add_argument("--folder", default=os.path.expanduser("~/Documents/Music/Stock"),
+                        help="Download folder (default: ~/Documents/Music/Stock)")
+    parser.add_argument("--policy", choices=POLICIES, default="priority", help="Queue ordering policy")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent downloads")
+    parser.add_argument("--priority", action="append", metavar="SHEET=N",
+                        help="Priority for a workbook, lower runs first (repeatable)")
+    parser.add_argument("--allow-video", action="store_true",
+                        help="Extract audio from video formats when a link has no audio-only format")
+    args = parser.parse_args()
+
+    run_schedule(
+        args.paths,
+        args.folder,
+        policy=args.policy,
+        max_workers=args.workers,
+        priorities=parse_priorities(args.priority),
+        log=lambda msg: print(msg, end=""),
+        allow_video=args.allow_video
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,16 @@
-# src/helpers/__init__.py
-from .download_utils import download_music
-from .metadata_utils import add_metadata
+# Heavy modules (pandas, yt_dlp) are only imported when a helper is first used,
+# so importing the package stays cheap for GUI startup.
+import importlib
 
-__all__ = ['download_music', 'add_metadata']
\ No newline at end of file
+_LAZY_ATTRS = {
+    'download_music': '.download_utils',
+    'add_metadata': '.metadata_utils',
+}
+
+__all__ = ['download_music', 'add_metadata']
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,273 @@
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from .plan_utils import extract_video_id
+
+# Resolved info (formats with signed stream URLs) is reused for at most this long;
+# YouTube signs stream URLs for about six hours
+RESOLVED_TTL = 4 * 60 * 60
+
+# Stop using resolved info this long before its stream URLs expire
+EXPIRY_MARGIN = 15 * 60
+
+# Title, duration and uploader rarely change, so they are kept much longer
+STATIC_TTL = 30 * 24 * 60 * 60
+
+# live:   extract from the network, cache the results
+# record: like live, and also write every extraction and search to the fixture folder
+# replay: read extractions and searches from the fixture folder only. This covers metadata
+#         and search; the download itself (process_ie_result) still fetches the fixture's
+#         stream URLs, so offline tests stub that step
+CACHE_MODES = ['live', 'record', 'replay']
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yt-mp4")
+
+STATIC_FIELDS = ['title', 'duration', 'uploader']
+
+# Resolved info dicts are hundreds of KB each (every format plus captions), so only the most
+# recently used few stay in memory; the rest are served from disk
+RESOLVED_MEMORY_ENTRIES = 32
+
+def cache_key(url):
+    """Key a URL by its YouTube video ID, or by a hash of the URL for other sites"""
+    return extract_video_id(url) or hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+def stream_expiry(info):
+    """Earliest 'expire' timestamp in the info's stream URLs, or None if they don't say"""
+    expiries = []
+    for fmt in info.get('formats') or []:
+        match = re.search(r'[?&/]expire[=/](\d+)', fmt.get('url') or '')
+        if match:
+            expiries.append(int(match.group(1)))
+    return min(expiries) if expiries else None
+
+def write_json(path, data):
+    """Write JSON atomically; the temp name is per-thread so concurrent writers don't collide"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as json_file:
+        json.dump(data, json_file)
+    os.replace(temp_path, path)
+
+def read_json(path):
+    """Read a JSON file, or return None if it is missing or damaged"""
+    try:
+        with open(path, 'r', encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+class InfoCache:
+    """
+    Two-level cache of yt-dlp extraction results, in memory (a small LRU for resolved info) and on disk.
+    Resolved info (formats and stream URLs) lives only as long as the stream URLs stay
+    valid, so retries and re-runs skip the extraction round-trip. Static metadata
+    (title, duration, uploader) is kept for weeks and can be read without a network call.
+    """
+
+    def __init__(self, cache_dir=None, mode=None, fixture_dir=None):
+        self.cache_dir = cache_dir or os.environ.get("YT_MP4_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.mode = mode or os.environ.get("YT_MP4_CACHE_MODE", "live")
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{self.mode}'. Expected one of: {', '.join(CACHE_MODES)}")
+        self.fixture_dir = fixture_dir or os.environ.get("YT_MP4_FIXTURE_DIR",
+                                                         os.path.join(self.cache_dir, "fixtures"))
+        self.resolved = OrderedDict()
+        self.static = {}
+        self.lock = threading.Lock()
+
+    def resolved_path(self, key):
+        return os.path.join(self.cache_dir, "resolved", f"{key}.json")
+
+    def static_path(self, key):
+        return os.path.join(self.cache_dir, "static", f"{key}.json")
+
+    def fixture_path(self, key):
+        return os.path.join(self.fixture_dir, f"{key}.json")
+
+    def search_fixture_path(self, query):
+        name = hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.fixture_dir, "search", f"{name}.json")
+
+    def forget(self, memory, path, key):
+        """Drop an expired or damaged entry from memory and disk"""
+        with self.lock:
+            memory.pop(key, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_resolved(self, key):
+        """Return a copy of still-valid resolved info for a key, or None"""
+        path = self.resolved_path(key)
+        with self.lock:
+            entry = self.resolved.get(key)
+        if entry is None:
+            entry = read_json(path)
+        if entry is None:
+            return None
+        try:
+            expired = entry['expires_at'] <= time.time()
+            info = entry['info']
+        except (KeyError, TypeError):
+            # Valid JSON but not a cache entry (hand-edited or from another version)
+            expired = True
+        if expired:
+            self.forget(self.resolved, path, key)
+            return None
+        self.remember_resolved(key, entry)
+        return copy.deepcopy(info)
+
+    def remember_resolved(self, key, entry):
+        """Keep an entry in the in-memory LRU, evicting the least recently used ones"""
+        with self.lock:
+            self.resolved[key] = entry
+            self.resolved.move_to_end(key)
+            while len(self.resolved) > RESOLVED_MEMORY_ENTRIES:
+                self.resolved.popitem(last=False)
+
+    def put_resolved(self, key, info):
+        """Cache resolved info until shortly before its stream URLs expire"""
+        now = time.time()
+        expires_at = now + RESOLVED_TTL
+        url_expiry = stream_expiry(info)
+        if url_expiry:
+            expires_at = min(expires_at, url_expiry - EXPIRY_MARGIN)
+        entry = {'fetched_at': now, 'expires_at': expires_at, 'info': info}
+        self.remember_resolved(key, entry)
+        try:
+            write_json(self.resolved_path(key), entry)
+        except OSError as e:
+            print(f"Could not write info cache: {e}")
+        self.put_static(key, info)
+
+    def invalidate(self, url):
+        """Forget resolved info for a URL, e.g. after its stream URLs were rejected"""
+        key = cache_key(url)
+        self.forget(self.resolved, self.resolved_path(key), key)
+
+    def get_static(self, key):
+        """Return cached title/duration/uploader for a key, or None"""
+        path = self.static_path(key)
+        with self.lock:
+            entry = self.static.get(key)
+        if entry is None:
+            entry = read_json(path)
+        if entry is None:
+            return None
+        try:
+            expired = entry['fetched_at'] + STATIC_TTL <= time.time()
+            metadata = dict(entry['metadata'])
+        except (KeyError, TypeError, ValueError):
+            expired = True
+        if expired:
+            self.forget(self.static, path, key)
+            return None
+        with self.lock:
+            self.static[key] = entry
+        return metadata
+
+    def put_static(self, key, info):
+        """Remember the static fields of a search result or info dict"""
+        metadata = {field: info.get(field) for field in STATIC_FIELDS}
+        if not any(metadata.values()):
+            return
+        entry = {'fetched_at': time.time(), 'metadata': metadata}
+        with self.lock:
+            self.static[key] = entry
+        try:
+            write_json(self.static_path(key), entry)
+        except OSError as e:
+            print(f"Could not write info cache: {e}")
+
+    def sweep(self):
+        """
+        Delete cache files older than their TTL, judged by modification time so the
+        (large) resolved entries don't have to be parsed.
+        :return: Number of files deleted.
+        """
+        removed = 0
+        now = time.time()
+        for folder, ttl in [("resolved", RESOLVED_TTL), ("static", STATIC_TTL)]:
+            folder_path = os.path.join(self.cache_dir, folder)
+            try:
+                names = os.listdir(folder_path)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(folder_path, name)
+                try:
+                    if os.path.getmtime(path) + ttl <= now:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def cached_duration(self, url):
+        """Expected duration in seconds from cached metadata, without a network call"""
+        metadata = self.get_static(cache_key(url))
+        return metadata.get('duration') if metadata else None
+
+    def resolve(self, url, ydl):
+        """
+        Get the unprocessed info dict for a URL, extracting it only when needed.
+        :param ydl: Open yt_dlp.YoutubeDL used for extraction on a miss.
+        :return: Tuple (info, from_cache).
+        """
+        key = cache_key(url)
+
+        if self.mode == 'replay':
+            info = read_json(self.fixture_path(key))
+            if info is None:
+                raise RuntimeError(f"No recorded info for {url} in {self.fixture_dir}")
+            self.put_static(key, info)
+            return info, True
+
+        info = self.get_resolved(key)
+        if info is not None:
+            return info, True
+
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False, process=False), True)
+        self.put_resolved(key, info)
+        if self.mode == 'record':
+            write_json(self.fixture_path(key), info)
+        return copy.deepcopy(info), False
+
+    def search(self, query, ydl):
+        """
+        Run a yt-dlp search query (e.g. 'ytsearch4:...'), through the fixtures in record/replay mode.
+        Search results are not cached in live mode; they should reflect what YouTube has now.
+        :param ydl: Open yt_dlp.YoutubeDL used unless replaying.
+        :return: Search result info dict.
+        """
+        if self.mode == 'replay':
+            results = read_json(self.search_fixture_path(query))
+            if results is None:
+                raise RuntimeError(f"No recorded search for '{query}' in {self.fixture_dir}")
+            return results
+
+        results = ydl.extract_info(query, download=False)
+        if self.mode == 'record':
+            results = ydl.sanitize_info(results, True)
+            write_json(self.search_fixture_path(query), results)
+        return results
+
+_info_cache = None
+_info_cache_lock = threading.Lock()
+
+def get_info_cache():
+    """Shared InfoCache configured from the environment (YT_MP4_CACHE_DIR, YT_MP4_CACHE_MODE)"""
+    global _info_cache
+    with _info_cache_lock:
+        if _info_cache is None:
+            _info_cache = InfoCache()
+            # Once per process is enough to keep the cache folder from growing without bound
+            _info_cache.sweep()
+        return _info_cache
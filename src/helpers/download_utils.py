@@ -1,9 +1,20 @@
 import os
+import re
+import csv
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox
 from .metadata_utils import add_metadata
+from .mp3_utils import verify_mp3
+from .cache_utils import get_info_cache
+from .library_utils import LibraryIndex, reconcile_plan
+from .plan_utils import INVALID_FILENAME_CHARS, clean_column, build_download_plan, set_plan_link
+from .manifest_utils import (
+    load_manifest, save_manifest, sheet_entries, split_unchanged_rows, record_row, recorded_paths,
+    prune_removed_rows
+)
 import time
+import threading
 import yt_dlp
 
 def safe_str(value):
@@ -14,8 +25,7 @@ def safe_str(value):
 
 def sanitize_filename(filename):
     """Remove or replace invalid characters for filenames"""
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
+    for char in INVALID_FILENAME_CHARS:
         filename = filename.replace(char, '_')
     return filename
 
@@ -37,14 +47,14 @@ def search_youtube(title, artist):
     }
     
     try:
+        cache = get_info_cache()
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            search_results = ydl.extract_info(
-                f"ytsearch4:{search_query}",
-                download=False
-            )
+            # Goes through the info cache so record/replay covers searches too
+            search_results = cache.search(f"ytsearch4:{search_query}", ydl)
             
             results = []
             for entry in search_results.get('entries', []):
+                cache.put_static(entry['id'], entry)
                 result = {
                     'title': entry.get('title', 'Unknown Title'),
                     'uploader': entry.get('uploader', 'Unknown Channel'),
@@ -297,26 +307,228 @@ class YouTubeSearchDialog:
         self.selected_url = None
         self.dialog.destroy()
 
-def download_with_ytdlp(url, output_path, filename):
-    """Download using yt-dlp"""
+# Target MP3 bitrate (kbps); also drives which source stream gets fetched
+TARGET_AUDIO_KBPS = 192
+
+# Rough bitrate needed for MP3-equivalent quality, relative to MP3 (Opus/AAC at ~128 kbps
+# sound about as good as MP3 at ~192). No YouTube audio-only stream reaches 192 kbps, so
+# comparing raw bitrates would always fall back to the largest stream.
+CODEC_EFFICIENCY = {'opus': 1.5, 'mp4a': 1.5, 'aac': 1.5, 'vorbis': 1.3, 'mp3': 1.0}
+
+FORMAT_LOG_FILENAME = "format_log.csv"
+
+# Downloads may run on several threads, so appends to the format log are serialised
+format_log_lock = threading.Lock()
+
+def format_bitrate(fmt):
+    """Return the audio bitrate of a yt-dlp format dict in kbps (0 if unknown)"""
+    return fmt.get('abr') or fmt.get('tbr') or 0
+
+def is_audio_only(fmt):
+    """Check whether a yt-dlp format dict carries audio and no video"""
+    return fmt.get('acodec') not in (None, 'none') and fmt.get('vcodec') == 'none'
+
+def has_audio(fmt):
+    """Check whether a yt-dlp format dict carries an audio track"""
+    return fmt.get('acodec') not in (None, 'none')
+
+def has_unknown_codecs(fmt):
+    """Formats from many non-YouTube sites don't say what they contain; they may still have audio"""
+    if fmt.get('acodec') == 'none':
+        return False
+    return fmt.get('acodec') is None or fmt.get('vcodec') is None
+
+def is_drc(fmt):
+    """YouTube's dynamic range compressed variants are marked in the format note and id"""
+    return 'drc' in (fmt.get('format_note') or '').lower() or str(fmt.get('format_id', '')).endswith('-drc')
+
+def language_rank(fmt):
+    """Higher for the original audio track than for dubbed or descriptive tracks"""
+    preference = fmt.get('language_preference')
+    if preference is None:
+        preference = -1
+    return preference, 'original' in (fmt.get('format_note') or '').lower()
+
+def codec_target(fmt, target_kbps):
+    """Bitrate this format's codec needs to match an MP3 at target_kbps"""
+    acodec = (fmt.get('acodec') or '').lower()
+    for codec, efficiency in CODEC_EFFICIENCY.items():
+        if acodec.startswith(codec):
+            return target_kbps / efficiency
+    return target_kbps
+
+def select_audio_format(formats, target_kbps=TARGET_AUDIO_KBPS, allow_video=False):
+    """
+    Pick the cheapest format that still satisfies the target output quality.
+    Only the original-language, non-DRC tracks are considered when the video has them.
+    On YouTube this usually picks the ~128 kbps AAC or Opus stream, so the saving over
+    'bestaudio' is small; the larger gains are on sites that offer big audio formats.
+    :param formats: List of yt-dlp format dicts.
+    :param target_kbps: Bitrate the MP3 will be transcoded to.
+    :param allow_video: Fall back to formats with a video track if no audio-only format exists.
+    :return: The chosen format dict, or None if nothing acceptable is available.
+    """
+    formats = [f for f in formats if not f.get('has_drm')]
+    candidates = [f for f in formats if is_audio_only(f)]
+    if not candidates and allow_video:
+        candidates = [f for f in formats if has_audio(f)]
+    if not candidates:
+        # What 'bestaudio/best' used to accept on sites that don't label codecs
+        candidates = [f for f in formats if has_unknown_codecs(f)]
+    if not candidates:
+        return None
+
+    # A dubbed track at a lower bitrate must not win over the original audio
+    best_language = max(language_rank(f) for f in candidates)
+    candidates = [f for f in candidates if language_rank(f) == best_language]
+    candidates = [f for f in candidates if not is_drc(f)] or candidates
+
+    # Smallest stream that meets the target; anything larger is thrown away by the transcode
+    good_enough = [f for f in candidates if format_bitrate(f) >= codec_target(f, target_kbps)]
+    if good_enough:
+        return min(good_enough, key=lambda f: (format_bitrate(f), f.get('filesize') or f.get('filesize_approx') or 0))
+
+    # Nothing reaches the target, so take the best of what there is
+    return max(candidates, key=format_bitrate)
+
+def make_format_selector(target_kbps=TARGET_AUDIO_KBPS, allow_video=False):
+    """Build a yt-dlp 'format' callable that applies select_audio_format"""
+    def selector(ctx):
+        fmt = select_audio_format(ctx.get('formats', []), target_kbps, allow_video)
+        if fmt is not None:
+            yield fmt
+    return selector
+
+def describe_format(info):
+    """Summarise the format yt-dlp actually downloaded for logging"""
+    if not info:
+        return {}
+    return {
+        'format_id': info.get('format_id', ''),
+        'ext': info.get('ext', ''),
+        'acodec': info.get('acodec', ''),
+        'abr': info.get('abr') or info.get('tbr') or '',
+        'filesize': info.get('filesize') or info.get('filesize_approx') or '',
+        'audio_only': info.get('vcodec') == 'none',
+    }
+
+def record_chosen_format(download_folder, title, artist, url, format_details):
+    """Append the format chosen for a song to the format log in the download folder"""
+    log_path = os.path.join(download_folder, FORMAT_LOG_FILENAME)
+    fieldnames = ['title', 'artist', 'url', 'format_id', 'ext', 'acodec', 'abr', 'filesize', 'audio_only']
+    try:
+        with format_log_lock:
+            write_header = not os.path.exists(log_path)
+            with open(log_path, 'a', newline='', encoding='utf-8') as log_file:
+                writer = csv.DictWriter(log_file, fieldnames=fieldnames)
+                if write_header:
+                    writer.writeheader()
+                writer.writerow({'title': title, 'artist': artist, 'url': url, **format_details})
+    except OSError as e:
+        print(f"Could not write format log: {e}")
+
+def download_with_ytdlp(url, output_path, filename, target_kbps=TARGET_AUDIO_KBPS, allow_video=False):
+    """
+    Download using yt-dlp, fetching the smallest audio stream that meets the target bitrate.
+    The video info is taken from the info cache when it is still fresh, so retries and
+    repeat downloads skip the extraction round-trip. In replay mode only the info comes
+    from fixtures; the download still goes to the stream URLs.
+    :return: Tuple (success, error_msg, info) where info is the yt-dlp info dict of the download.
+    """
     ydl_opts = {
-        'format': 'bestaudio/best',
+        'format': make_format_selector(target_kbps, allow_video),
         'outtmpl': os.path.join(output_path, filename),
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
             'preferredcodec': 'mp3',
-            'preferredquality': '192',
+            'preferredquality': str(target_kbps),
         }],
         'quiet': True,
         'no_warnings': True
     }
     
+    cache = get_info_cache()
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        return True, None
+            info, from_cache = cache.resolve(url, ydl)
+            try:
+                info = ydl.process_ie_result(info, download=True)
+            except yt_dlp.utils.DownloadError:
+                if not from_cache or cache.mode == 'replay':
+                    raise
+                # Cached stream URLs were rejected early; extract once more and retry
+                cache.invalidate(url)
+                info, _ = cache.resolve(url, ydl)
+                info = ydl.process_ie_result(info, download=True)
+        return True, None, info
     except Exception as e:
-        return False, str(e)
+        error = str(e)
+        if not allow_video and "Requested format is not available" in error:
+            error += " (no audio-only format; enable 'Allow video formats' / --allow-video to extract audio from video)"
+        return False, error, None
+
+SHEET_COLUMNS = ['Title', 'Artist', 'YouTube Link', 'Genre']
+
+# Column the batch and queue tools write per-row outcomes into (see schedule_utils)
+STATUS_COLUMN = 'Download Status'
+
+# Values those tools write; 'Failed' is followed by the error message
+RUN_STATUSES = ['Downloaded', 'Exists', 'Copied', 'Present locally', 'Needs search', 'Duplicate', 'Pending', 'Failed']
+
+def has_sheet_headers(excel_path):
+    """Check whether a workbook's first row holds the SHEET_COLUMNS headers"""
+    columns = pd.read_excel(excel_path, nrows=0).columns
+    return all(col in columns for col in SHEET_COLUMNS)
+
+def is_status_column(series):
+    """Check whether a headerless column holds only statuses written by write_sheet_results"""
+    values = clean_column(series)
+    values = values[values != '']
+    pattern = '|'.join(re.escape(status) for status in RUN_STATUSES)
+    return len(values) > 0 and bool(values.str.match(pattern).all())
+
+def read_music_sheet(excel_path, log=print):
+    """
+    Read a music sheet and normalise it to Title | Artist | YouTube Link | Genre.
+    :param excel_path: Path to the Excel file.
+    :param log: Callable receiving progress messages.
+    :return: Tuple (df, error_msg); df is None if the layout is not recognised.
+    """
+    # First, try to read with headers
+    df = pd.read_excel(excel_path)
+    
+    # Check if we have the expected columns
+    if all(col in df.columns for col in SHEET_COLUMNS):
+        return df, None
+
+    # If not, assume no headers and add them
+    log("No proper headers found, detecting column structure...\n")
+    df = pd.read_excel(excel_path, header=None)
+    
+    # A status column written back by the batch tools sits after the data columns
+    if df.shape[1] in (5, 6) and is_status_column(df.iloc[:, -1]):
+        df = df.iloc[:, :-1]
+    
+    # Handle different column structures
+    if df.shape[1] == 4:
+        df.columns = SHEET_COLUMNS
+    elif df.shape[1] == 5:
+        # Check if there are YouTube links in multiple columns
+        log("Detected 5 columns, merging YouTube link columns...\n")
+        df.columns = ['Title', 'Artist', 'YouTube Link 1', 'Genre', 'YouTube Link 2']
+        
+        # Merge the YouTube link columns (prefer non-empty values, ignore header-like values)
+        links = []
+        for column in ['YouTube Link 1', 'YouTube Link 2']:
+            link = clean_column(df[column])
+            links.append(link.mask(link.isin(['Unnamed: 2', 'YT Link']), ''))
+        df['YouTube Link'] = links[0].where(links[0] != '', links[1])
+        # Keep only the expected columns
+        df = df[SHEET_COLUMNS]
+    else:
+        return None, f"Unexpected number of columns: {df.shape[1]}. Expected 4 or 5."
+    
+    return df, None
 
 def find_row_index_by_title_artist(excel_path, target_title, target_artist):
     """Find the correct row index for a given title and artist"""
@@ -404,47 +616,113 @@ def update_excel_with_url(excel_path, row_index, url, expected_title=None, expec
         traceback.print_exc()
         return False
 
-def download_music(excel_path, download_folder, status_text, progress_bar, progress_text, root, add_metadata_func):
+# Extra downloads attempted when a file fails verification
+VERIFY_RETRIES = 1
+
+def download_song(url, title, artist, genre, download_folder, add_metadata_func, log=print, allow_video=False):
+    """
+    Download one song into its genre folder as 'Song Name (Artist).mp3'.
+    :param log: Callable receiving progress messages.
+    :param allow_video: Fall back to formats with a video track when no audio-only format exists.
+    :return: Tuple (status, detail); status is 'downloaded' or 'exists' with the file path
+             as detail, or 'failed' with an error message.
+    """
+    expected_file_path = None
+    try:
+        # Create genre folder if it doesn't exist
+        genre_folder = os.path.join(download_folder, sanitize_filename(genre))
+        os.makedirs(genre_folder, exist_ok=True)
+
+        # Check if file already exists
+        expected_file_path = get_safe_filepath(title, artist, genre_folder)
+        if os.path.exists(expected_file_path):
+            log(f"⏭️ Skipping '{title} ({artist})' - Already exists\n")
+            return 'exists', expected_file_path
+
+        # Update status
+        log(f"\nDownloading: {title} ({artist})\n")
+        
+        # Download using yt-dlp (artist in the temp name keeps parallel downloads apart)
+        temp_filename = f"temp_{sanitize_filename(title)}_{sanitize_filename(artist)}"
+        # Get the downloaded file (yt-dlp adds .mp3 extension)
+        temp_file = os.path.join(genre_folder, temp_filename + '.mp3')
+
+        for attempt in range(1 + VERIFY_RETRIES):
+            success, error, info = download_with_ytdlp(url, genre_folder, temp_filename, allow_video=allow_video)
+
+            if not success:
+                log(f"❌ Download failed for '{title} ({artist})': {error}\n")
+                return 'failed', error
+
+            format_details = describe_format(info)
+            if format_details:
+                log(f"🎚️ Format {format_details['format_id']} ({format_details['acodec']}, {format_details['abr']} kbps)\n")
+                record_chosen_format(download_folder, title, artist, url, format_details)
+            
+            if not os.path.exists(temp_file):
+                log(f"❌ Failed to download '{title} ({artist})'\n")
+                return 'failed', "Downloaded file not found"
+
+            # Walk the MP3 frames in-process to catch truncated or empty files
+            ok, problem, duration = verify_mp3(temp_file, (info or {}).get('duration'))
+            if ok:
+                break
+            os.remove(temp_file)
+            log(f"⚠️ Verification failed for '{title} ({artist})': {problem}\n")
+        else:
+            return 'failed', f"Verification failed: {problem}"
+
+        # Rename to final filename
+        os.rename(temp_file, expected_file_path)
+        
+        # Add metadata
+        add_metadata_func(expected_file_path, title, artist)
+        
+        log(f"✅ Successfully downloaded: {title} ({artist})\n")
+        return 'downloaded', expected_file_path
+        
+    except Exception as e:
+        log(f"❌ Error processing '{title} ({artist})': {str(e)}\n")
+        # Cleanup any partial downloads
+        if expected_file_path and os.path.exists(expected_file_path):
+            try:
+                os.remove(expected_file_path)
+            except:
+                pass
+        return 'failed', str(e)
+
+# Save the manifest after this many newly recorded rows, so a crash loses little progress
+MANIFEST_SAVE_INTERVAL = 50
+
+def drop_unchanged_rows(plan, entries):
+    """
+    Remove rows that an earlier run already handled and whose output still exists.
+    :return: Tuple (pending_plan, skipped_count).
+    """
+    unchanged = split_unchanged_rows(plan['hash'], entries)
+    pending = plan[[not skip for skip in unchanged]]
+    return pending, sum(unchanged)
+
+def prune_sheet_rows(plan, manifest, excel_path, log=print):
+    """
+    Delete files of rows removed from the sheet since the last run.
+    Files that a row of any other workbook in the same download folder still uses are kept.
+    :return: Number of files deleted.
+    """
+    current_paths = set(plan.loc[plan['action'] != 'invalid', 'output_path'])
+    current_paths |= recorded_paths(manifest, skip_excel_path=excel_path)
+    return prune_removed_rows(sheet_entries(manifest, excel_path), set(plan['hash']), current_paths, log)
+
+def download_music(excel_path, download_folder, status_text, progress_bar, progress_text, root, add_metadata_func,
+                   incremental=True, prune_removed=False, reconcile_library=True, allow_video=False):
     try:
         # Read the Excel file
         status_text.insert(tk.END, "Reading Excel file...\n")
         
-        # First, try to read with headers
-        df = pd.read_excel(excel_path)
-        
-        # Check if we have the expected columns
-        expected_columns = ['Title', 'Artist', 'YouTube Link', 'Genre']
-        if not all(col in df.columns for col in expected_columns):
-            # If not, assume no headers and add them
-            status_text.insert(tk.END, "No proper headers found, detecting column structure...\n")
-            df = pd.read_excel(excel_path, header=None)
-            
-            # Handle different column structures
-            if df.shape[1] == 4:
-                df.columns = ['Title', 'Artist', 'YouTube Link', 'Genre']
-            elif df.shape[1] == 5:
-                # Check if there are YouTube links in multiple columns
-                status_text.insert(tk.END, "Detected 5 columns, merging YouTube link columns...\n")
-                df.columns = ['Title', 'Artist', 'YouTube Link 1', 'Genre', 'YouTube Link 2']
-                
-                # Merge the YouTube link columns (prefer non-empty values)
-                def merge_links(row):
-                    link1 = safe_str(row['YouTube Link 1'])
-                    link2 = safe_str(row['YouTube Link 2'])
-                    # Skip header-like values
-                    if link1 in ['Unnamed: 2', 'YT Link'] or not link1:
-                        link1 = ''
-                    if link2 in ['Unnamed: 2', 'YT Link'] or not link2:
-                        link2 = ''
-                    # Return the first non-empty link
-                    return link1 if link1 else link2
-                
-                df['YouTube Link'] = df.apply(merge_links, axis=1)
-                # Keep only the expected columns
-                df = df[['Title', 'Artist', 'YouTube Link', 'Genre']]
-            else:
-                status_text.insert(tk.END, f"❌ Unexpected number of columns: {df.shape[1]}. Expected 4 or 5.\n")
-                return False
+        df, error = read_music_sheet(excel_path, lambda msg: status_text.insert(tk.END, msg))
+        if df is None:
+            status_text.insert(tk.END, f"❌ {error}\n")
+            return False
         
         status_text.insert(tk.END, f"Found {len(df)} rows\n")
         status_text.insert(tk.END, f"Columns found: {', '.join(df.columns)}\n")
@@ -458,36 +736,45 @@ def download_music(excel_path, download_folder, status_text, progress_bar, progr
             status_text.insert(tk.END, f"  Row {i}: '{title}' | '{artist}' | '{url}'\n")
         root.update()
         
-        total_songs = len(df)
+        # Classify every row once; both phases work from this plan
+        plan = build_download_plan(df, download_folder)
+        
+        # Incremental sync: rows handled by an earlier run are skipped in bulk
+        manifest = load_manifest(download_folder) if incremental else None
+        entries = sheet_entries(manifest, excel_path) if incremental else {}
+        # Files this tool downloaded before, so an edited row keeps its file prunable
+        downloaded_paths = recorded_paths(manifest, downloaded_only=True) if incremental else set()
+        if prune_removed and not incremental:
+            status_text.insert(tk.END, "⚠️ Deleting files of removed rows needs incremental sync - not deleting anything\n")
+        if incremental:
+            if prune_removed:
+                pruned = prune_sheet_rows(plan, manifest, excel_path, lambda msg: status_text.insert(tk.END, msg))
+                status_text.insert(tk.END, f"🗑️ Pruned {pruned} files of rows removed from the sheet\n")
+            plan, unchanged_count = drop_unchanged_rows(plan, entries)
+            plan = plan.copy()
+            status_text.insert(tk.END, f"⚡ Incremental sync: {unchanged_count} unchanged rows skipped, {len(plan)} to check\n")
+            root.update()
+        
+        # Rows without a link may already be in the library under a slightly different name
+        if reconcile_library and (plan['action'] == 'search').any():
+            library = LibraryIndex(download_folder)
+            found = reconcile_plan(plan, library, lambda msg: status_text.insert(tk.END, msg))
+            status_text.insert(tk.END, f"📁 {found} songs without links matched files already in the library ({len(library)} files)\n")
+            root.update()
         
         # PHASE 1: Handle YouTube link searches
         status_text.insert(tk.END, "\n🔍 PHASE 1: Searching for missing YouTube links...\n")
         root.update()
         
-        songs_needing_search = []
-        for index, row in df.iterrows():
-            title = safe_str(row.get('Title', ''))
-            artist = safe_str(row.get('Artist', ''))
-            url = safe_str(row.get('YouTube Link', ''))
-            
-            if not title or not artist:
-                status_text.insert(tk.END, f"❌ Skipping row {index + 1}: Missing title or artist\n")
-                continue
-            
-            # Skip if already has a YouTube URL (contains youtube.com or youtu.be)
-            if url and ('youtube.com' in url.lower() or 'youtu.be' in url.lower()):
-                status_text.insert(tk.END, f"✅ Skipping '{title} ({artist})' - Already has YouTube URL\n")
-                continue
-                
-            # Skip if already marked as SKIPPED
-            if url.upper() == "SKIPPED":
-                status_text.insert(tk.END, f"⏭️ Skipping '{title} ({artist})' - Previously marked as skipped\n")
-                continue
-                
-            # Only add to search list if no URL at all
-            if not url:
-                songs_needing_search.append((index, title, artist))
+        for row in plan.itertuples():
+            if row.action == 'invalid':
+                status_text.insert(tk.END, f"❌ Skipping row {row.Index + 1}: Missing title or artist\n")
+            elif row.link_type == 'youtube':
+                status_text.insert(tk.END, f"✅ Skipping '{row.title} ({row.artist})' - Already has YouTube URL\n")
+            elif row.action == 'skip':
+                status_text.insert(tk.END, f"⏭️ Skipping '{row.title} ({row.artist})' - Previously marked as skipped\n")
         
+        songs_needing_search = list(plan.loc[plan['action'] == 'search', ['title', 'artist']].itertuples(name=None))
         if songs_needing_search:
             status_text.insert(tk.END, f"Found {len(songs_needing_search)} songs needing YouTube links\n")
             
@@ -527,11 +814,8 @@ def download_music(excel_path, download_folder, status_text, progress_bar, progr
                     if correct_row_index is not None:
                         if update_excel_with_url(excel_path, correct_row_index, "SKIPPED", title, artist):
                             status_text.insert(tk.END, f"✅ Marked '{title} ({artist})' as SKIPPED in Excel\n")
-                            # Reload the dataframe to ensure consistency
-                            df = pd.read_excel(excel_path)
-                            # Handle column structure again after reload
-                            if df.shape[1] == 4:
-                                df.columns = ['Title', 'Artist', 'YouTube Link', 'Genre']
+                            # Keep the plan in step with the sheet instead of re-reading it
+                            set_plan_link(plan, index, "SKIPPED")
                             root.update()
                         else:
                             status_text.insert(tk.END, f"⚠️ Failed to mark '{title} ({artist})' as SKIPPED\n")
@@ -546,11 +830,8 @@ def download_music(excel_path, download_folder, status_text, progress_bar, progr
                 if correct_row_index is not None:
                     if update_excel_with_url(excel_path, correct_row_index, selected_url, title, artist):
                         status_text.insert(tk.END, f"✅ Updated Excel with URL for '{title} ({artist})'\n")
-                        # Reload the dataframe to ensure consistency
-                        df = pd.read_excel(excel_path)
-                        # Handle column structure again after reload
-                        if df.shape[1] == 4:
-                            df.columns = ['Title', 'Artist', 'YouTube Link', 'Genre']
+                        # Keep the plan in step with the sheet instead of re-reading it
+                        set_plan_link(plan, index, selected_url)
                         root.update()
                     else:
                         status_text.insert(tk.END, f"⚠️ Failed to update Excel for '{title} ({artist})'\n")
@@ -563,86 +844,57 @@ def download_music(excel_path, download_folder, status_text, progress_bar, progr
         status_text.insert(tk.END, "\n⬇️ PHASE 2: Downloading songs...\n")
         root.update()
         
+        total_songs = len(plan)
         downloaded_count = 0
-        for index, row in df.iterrows():
-            # Safely convert values to strings
-            title = safe_str(row.get('Title', ''))
-            artist = safe_str(row.get('Artist', ''))
-            url = safe_str(row.get('YouTube Link', ''))
-            genre = safe_str(row.get('Genre', 'Default'))
+        unsaved_rows = 0
+        for position, row in enumerate(plan.itertuples()):
+            title, artist = row.title, row.artist
             
-            if not title or not artist:
+            if row.action == 'invalid':
+                record_row(entries, row.hash, title, artist, None)
                 continue
                 
             # Skip if marked as SKIPPED
-            if url.upper() == "SKIPPED":
+            if row.action == 'skip':
                 status_text.insert(tk.END, f"⏭️ Skipping '{title} ({artist})' - Marked as skipped\n")
+                record_row(entries, row.hash, title, artist, None)
                 continue
                 
-            if not url:
+            if row.action == 'search':
                 status_text.insert(tk.END, f"⏭️ Skipping '{title} ({artist})' - No YouTube link\n")
                 continue
-
-            try:
-                # Create genre folder if it doesn't exist
-                genre_folder = os.path.join(download_folder, sanitize_filename(genre))
-                os.makedirs(genre_folder, exist_ok=True)
-
-                # Check if file already exists
-                expected_file_path = get_safe_filepath(title, artist, genre_folder)
-                if os.path.exists(expected_file_path):
-                    status_text.insert(tk.END, f"⏭️ Skipping '{title} ({artist})' - Already exists\n")
-                    
-                    # Update progress for skipped file
-                    progress = (index + 1) / total_songs * 100
-                    progress_bar['value'] = progress
-                    progress_text.config(text=f"{progress:.1f}%")
-                    root.update()
-                    continue
-
-                # Update status
-                status_text.insert(tk.END, f"\nDownloading: {title} ({artist})\n")
-                root.update()
                 
-                # Download using yt-dlp
-                temp_filename = f"temp_{sanitize_filename(title)}"
-                success, error = download_with_ytdlp(url, genre_folder, temp_filename)
-
-                if not success:
-                    status_text.insert(tk.END, f"❌ Download failed for '{title} ({artist})': {error}\n")
-                    continue
+            # Matched to an existing library file before PHASE 1; never a prune target
+            if row.action == 'present':
+                record_row(entries, row.hash, title, artist, row.output_path)
+                continue
 
-                # Get the downloaded file (yt-dlp adds .mp3 extension)
-                temp_file = os.path.join(genre_folder, temp_filename + '.mp3')
-                
-                if os.path.exists(temp_file):
-                    # Rename to final filename
-                    os.rename(temp_file, expected_file_path)
-                    
-                    # Add metadata
-                    add_metadata_func(expected_file_path, title, artist)
-                    
-                    downloaded_count += 1
-                    status_text.insert(tk.END, f"✅ Successfully downloaded: {title} ({artist})\n")
-                else:
-                    status_text.insert(tk.END, f"❌ Failed to download '{title} ({artist})'\n")
-                
-            except Exception as e:
-                status_text.insert(tk.END, f"❌ Error processing '{title} ({artist})': {str(e)}\n")
-                # Cleanup any partial downloads
-                if os.path.exists(expected_file_path):
-                    try:
-                        os.remove(expected_file_path)
-                    except:
-                        pass
+            status, detail = download_song(row.url, title, artist, row.genre, download_folder, add_metadata_func,
+                                           log=lambda msg: status_text.insert(tk.END, msg), allow_video=allow_video)
+            if status == 'failed':
                 continue
+            if status == 'downloaded':
+                downloaded_count += 1
+            
+            if incremental:
+                downloaded = status == 'downloaded' or detail in downloaded_paths
+                record_row(entries, row.hash, title, artist, detail, downloaded, row.url)
+                unsaved_rows += 1
+                if unsaved_rows >= MANIFEST_SAVE_INTERVAL:
+                    save_manifest(download_folder, manifest)
+                    unsaved_rows = 0
             
             # Update progress
-            progress = (index + 1) / total_songs * 100
+            progress = (position + 1) / total_songs * 100
             progress_bar['value'] = progress
             progress_text.config(text=f"{progress:.1f}%")
             root.update()
             
+        if incremental:
+            success, error = save_manifest(download_folder, manifest)
+            if not success:
+                status_text.insert(tk.END, f"⚠️ Could not save sync manifest: {error}\n")
+        
         status_text.insert(tk.END, f"\n🎉 Download process completed! Downloaded {downloaded_count} new songs.\n")
         return True
         
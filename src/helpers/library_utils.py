@@ -0,0 +1,111 @@
+import os
+import re
+import math
+
+# A row counts as present locally only above this score
+MATCH_THRESHOLD = 0.85
+
+# Words uploaders add to file names that say nothing about which song it is
+NOISE_WORDS = {
+    'official', 'audio', 'video', 'lyrics', 'lyric', 'hd', 'hq', 'remastered', 'remaster',
+    'explicit', 'extended', 'music', 'mv', 'visualizer', 'feat', 'ft', 'topic', 'mp3',
+}
+
+def clean_text(text):
+    """Normalise text the way scrapeFolder.clean_filename does, minus the extension handling"""
+    text = text.replace("'", "")  # So "Don't" and "Dont" agree
+    text = re.sub(r'[^a-zA-Z0-9 ]', ' ', text)  # Remove special characters
+    return re.sub(r'\s+', ' ', text).strip()  # Remove extra spaces
+
+def tokenize(text):
+    """Split normalised text into a set of lowercase tokens"""
+    return set(clean_text(text).lower().split())
+
+class LibraryIndex:
+    """
+    Inverted token index over the MP3 file names in a library folder.
+    Each token maps to the files whose cleaned name contains it, so a row is only
+    compared against files that share at least one token with it.
+    """
+
+    def __init__(self, folder):
+        self.files = []
+        self.file_tokens = []
+        self.postings = {}
+        for root, _, names in os.walk(folder):
+            for name in names:
+                if not name.lower().endswith(".mp3"):
+                    continue
+                tokens = tokenize(os.path.splitext(name)[0])
+                if not tokens:
+                    continue
+                file_id = len(self.files)
+                self.files.append(os.path.join(root, name))
+                self.file_tokens.append(tokens)
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(file_id)
+
+    def __len__(self):
+        return len(self.files)
+
+    def idf(self, token):
+        """Rare tokens (names) weigh more than common ones ('the', 'remix')"""
+        return math.log((len(self.files) + 1) / (len(self.postings.get(token, ())) + 1)) + 1
+
+    def weight(self, tokens):
+        return sum(self.idf(token) for token in tokens)
+
+    def score(self, title_tokens, artist_tokens, file_tokens):
+        """
+        Similarity between a row and one file name, between 0 and 1.
+        Title and artist coverage, scaled down by any words in the file name that
+        belong to neither (so 'Story' doesn't match 'Love Story').
+        """
+        title_cov = self.weight(title_tokens & file_tokens) / self.weight(title_tokens)
+        artist_cov = self.weight(artist_tokens & file_tokens) / self.weight(artist_tokens)
+        extra = self.weight(file_tokens - title_tokens - artist_tokens - NOISE_WORDS) / self.weight(file_tokens)
+        return (0.65 * title_cov + 0.35 * artist_cov) * (1 - extra)
+
+    def match(self, title, artist):
+        """
+        Find the library file for a song.
+        :return: Tuple (file_path, score); file_path is None unless the match is confident.
+        """
+        title_tokens = tokenize(title) - NOISE_WORDS
+        artist_tokens = tokenize(artist) - NOISE_WORDS
+        if not title_tokens or not artist_tokens:
+            return None, 0.0
+
+        # Very common words would pull in most of the library, so only use them as a last resort
+        common_limit = max(1, len(self.files) // 20)
+        rare_tokens = [token for token in title_tokens if len(self.postings.get(token, ())) <= common_limit]
+        candidates = set()
+        for token in rare_tokens or title_tokens:
+            candidates |= self.postings.get(token, set())
+
+        best_id, best = None, 0.0
+        for file_id in candidates:
+            score = self.score(title_tokens, artist_tokens, self.file_tokens[file_id])
+            if score > best:
+                best_id, best = file_id, score
+
+        if best_id is None or best < MATCH_THRESHOLD:
+            return None, best
+        return self.files[best_id], best
+
+def reconcile_plan(plan, index, log=print):
+    """
+    Mark plan rows that still need a search as 'present' when the library already has them.
+    The matched file replaces the row's output_path.
+    :return: Number of rows marked present.
+    """
+    found = 0
+    for row in plan[plan['action'] == 'search'].itertuples():
+        file_path, score = index.match(row.title, row.artist)
+        if file_path is None:
+            continue
+        plan.at[row.Index, 'action'] = 'present'
+        plan.at[row.Index, 'output_path'] = file_path
+        found += 1
+        log(f"📁 '{row.title} ({row.artist})' is already in the library as '{os.path.basename(file_path)}' ({score:.2f})\n")
+    return found
@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+
+MANIFEST_FILENAME = ".sync_manifest.json"
+
+MANIFEST_VERSION = 1
+
+def row_hash(title, artist, url, genre):
+    """Hash the cells that decide what a row downloads and where it goes"""
+    return row_hashes([title], [artist], [url], [genre])[0]
+
+def row_hashes(titles, artists, urls, genres):
+    """row_hash for many rows at once, without a Python call per row"""
+    sha1 = hashlib.sha1
+    return [sha1("\x1f".join(values).encode('utf-8')).hexdigest()
+            for values in zip(titles, artists, urls, genres)]
+
+def load_manifest(download_folder):
+    """
+    Load the run manifest stored in the download folder.
+    :return: Manifest dict; an empty one if the file is missing or unreadable.
+    """
+    manifest_path = os.path.join(download_folder, MANIFEST_FILENAME)
+    empty = {'version': MANIFEST_VERSION, 'sheets': {}}
+    if not os.path.exists(manifest_path):
+        return empty
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get('version') != MANIFEST_VERSION:
+            print(f"Ignoring manifest with unknown version {manifest.get('version')}")
+            return empty
+        return manifest
+    except (OSError, ValueError) as e:
+        print(f"Could not read manifest, starting fresh: {e}")
+        return empty
+
+def save_manifest(download_folder, manifest):
+    """
+    Write the manifest atomically so an interrupted run can't leave half a file.
+    :return: Tuple (success, error_msg).
+    """
+    manifest_path = os.path.join(download_folder, MANIFEST_FILENAME)
+    temp_path = manifest_path + ".tmp"
+    try:
+        os.makedirs(download_folder, exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temp_path, manifest_path)
+        return True, None
+    except OSError as e:
+        return False, str(e)
+
+def sheet_entries(manifest, excel_path):
+    """Return the (mutable) row entries recorded for one workbook"""
+    return manifest['sheets'].setdefault(os.path.abspath(excel_path), {})
+
+def is_unchanged(entry):
+    """A recorded row can be skipped if it had no output or its output is still on disk"""
+    return entry.get('output_path') is None or os.path.exists(entry['output_path'])
+
+def split_unchanged_rows(hashes, entries):
+    """
+    Find the rows that were handled by an earlier run and need no work now.
+    :param hashes: List of row hashes, one per sheet row.
+    :param entries: Row entries from sheet_entries().
+    :return: List of booleans, True where the row can be skipped.
+    """
+    return [h in entries and is_unchanged(entries[h]) for h in hashes]
+
+def record_row(entries, hash_value, title, artist, output_path, downloaded=False, url=None):
+    """
+    Remember how a row was resolved; output_path is None for rows with nothing to download.
+    :param downloaded: True if this tool downloaded the file (only those files are ever pruned).
+    :param url: Link the file was downloaded from, so its expected duration can be looked up later.
+    """
+    entries[hash_value] = {'title': title, 'artist': artist, 'output_path': output_path,
+                           'downloaded': downloaded, 'url': url}
+
+def recorded_durations(manifest, duration_lookup):
+    """
+    Expected durations of the downloaded files recorded in a manifest.
+    :param duration_lookup: Callable url -> duration in seconds or None (e.g. InfoCache.cached_duration).
+    :return: Dict of absolute file path -> duration.
+    """
+    durations = {}
+    for entries in manifest['sheets'].values():
+        for entry in entries.values():
+            if not entry.get('output_path') or not entry.get('url'):
+                continue
+            duration = duration_lookup(entry['url'])
+            if duration:
+                durations[os.path.abspath(entry['output_path'])] = duration
+    return durations
+
+def recorded_paths(manifest, skip_excel_path=None, downloaded_only=False):
+    """
+    Output paths recorded for the workbooks that share this manifest.
+    :param skip_excel_path: Leave out the rows of this workbook.
+    :param downloaded_only: Only paths of files this tool downloaded.
+    :return: Set of file paths.
+    """
+    skip = os.path.abspath(skip_excel_path) if skip_excel_path else None
+    return {entry['output_path']
+            for excel_path, entries in manifest['sheets'].items() if excel_path != skip
+            for entry in entries.values()
+            if entry.get('output_path') and (entry.get('downloaded') or not downloaded_only)}
+
+def prune_removed_rows(entries, current_hashes, current_paths, log=print):
+    """
+    Delete files of rows that are no longer in the sheet and forget those rows.
+    Only files this tool downloaded are deleted; files still wanted by a current row
+    (e.g. the row was only edited, or another workbook has the same song) are kept.
+    :param current_hashes: Set of hashes of the rows in the sheet now.
+    :param current_paths: Set of output paths still in use by any workbook.
+    :return: Number of files deleted.
+    """
+    removed = 0
+    for hash_value in [h for h in entries if h not in current_hashes]:
+        entry = entries.pop(hash_value)
+        output_path = entry.get('output_path')
+        if not entry.get('downloaded') or not output_path:
+            continue
+        if output_path in current_paths or not os.path.exists(output_path):
+            continue
+        try:
+            os.remove(output_path)
+            removed += 1
+            log(f"🗑️ Removed '{entry.get('title')} ({entry.get('artist')})' - No longer in sheet\n")
+        except OSError as e:
+            log(f"⚠️ Could not remove '{output_path}': {e}\n")
+    return removed
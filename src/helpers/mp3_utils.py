@@ -0,0 +1,258 @@
+import os
+import glob
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+
+# Bitrates in kbps, indexed by the 4-bit bitrate field (0 = free format, 15 = invalid)
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates indexed by the 2-bit version field (MPEG 2.5, reserved, MPEG 2, MPEG 1)
+SAMPLE_RATES = {0: [11025, 12000, 8000], 2: [22050, 24000, 16000], 3: [44100, 48000, 32000]}
+
+# How far into the audio data to look for the first frame before giving up
+MAX_SYNC_SEARCH = 64 * 1024
+
+# Missing audio tolerated before a file counts as truncated
+TRUNCATION_TOLERANCE = 0.02
+
+def parse_frame_header(header):
+    """
+    Decode a 32-bit MPEG audio frame header.
+    :return: Dict with frame length, samples and sample rate, or None if the header is invalid.
+    """
+    if (header >> 21) & 0x7FF != 0x7FF:
+        return None
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    version = 1 if version_bits == 3 else 2  # MPEG 2.5 uses the MPEG 2 tables
+    layer = 4 - layer_bits
+    bitrate = BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][rate_index]
+    padding = (header >> 9) & 0x1
+    mono = (header >> 6) & 0x3 == 3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+
+    # Offset of a Xing/Info tag: header + optional CRC + side information
+    crc = 2 if not (header >> 16) & 0x1 else 0
+    if version == 1:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+
+    return {
+        'length': length,
+        'samples': samples,
+        'sample_rate': sample_rate,
+        'bitrate': bitrate,
+        'xing_offset': 4 + crc + side_info,
+    }
+
+def audio_bounds(data):
+    """
+    Find where the audio frames live, skipping ID3v2, APEv2 and ID3v1 tags.
+    :return: Tuple (start, end) byte offsets.
+    """
+    start, end = 0, len(data)
+
+    # ID3v2 at the front: 10-byte header with a syncsafe size, plus optional footer
+    if end >= 10 and data[0:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    # ID3v1 in the last 128 bytes
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+
+    # APEv2 footer; its size covers items and footer but not the optional header
+    if end - start >= 32 and data[end - 32:end - 24] == b"APETAGEX":
+        size = int.from_bytes(data[end - 20:end - 16], 'little')
+        flags = int.from_bytes(data[end - 12:end - 8], 'little')
+        end -= size + (32 if flags & 0x80000000 else 0)
+
+    return start, max(start, end)
+
+def find_first_frame(data, start, end):
+    """Find the first offset where two consecutive valid frame headers line up"""
+    limit = min(end - 4, start + MAX_SYNC_SEARCH)
+    position = data.find(b"\xff", start, limit)
+    while position != -1:
+        frame = parse_frame_header(int.from_bytes(data[position:position + 4], 'big'))
+        if frame:
+            following = position + frame['length']
+            # A lone frame at the very end is accepted; otherwise the next one must also be valid
+            if following + 4 > end or parse_frame_header(int.from_bytes(data[following:following + 4], 'big')):
+                return position, frame
+        position = data.find(b"\xff", position + 1, limit)
+    return None, None
+
+def read_vbr_header(data, position, frame):
+    """
+    Read the frame count from a Xing/Info or VBRI tag in the first frame.
+    :return: Tuple (frame_count, byte_count); either may be None.
+    """
+    xing = position + frame['xing_offset']
+    tag = data[xing:xing + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[xing + 4:xing + 8], 'big')
+        offset = xing + 8
+        frames = byte_count = None
+        if flags & 0x1:
+            frames = int.from_bytes(data[offset:offset + 4], 'big')
+            offset += 4
+        if flags & 0x2:
+            byte_count = int.from_bytes(data[offset:offset + 4], 'big')
+        return frames, byte_count
+
+    # VBRI always sits 32 bytes after the header
+    vbri = position + 36
+    if data[vbri:vbri + 4] == b"VBRI":
+        byte_count = int.from_bytes(data[vbri + 10:vbri + 14], 'big')
+        frames = int.from_bytes(data[vbri + 14:vbri + 18], 'big')
+        return frames, byte_count
+
+    return None, None
+
+def scan_mp3(data):
+    """
+    Walk every frame header of an MP3 held in a bytes-like object (e.g. an mmap).
+    :return: Dict with duration, frames, truncation flags and a problem message (None if sound).
+    """
+    result = {'duration': 0.0, 'frames': 0, 'truncated': False, 'problem': None}
+    start, end = audio_bounds(data)
+    position, frame = find_first_frame(data, start, end)
+    if position is None:
+        result['problem'] = "No MPEG audio frames found"
+        return result
+
+    declared_frames, declared_bytes = read_vbr_header(data, position, frame)
+    if declared_frames is not None or declared_bytes is not None:
+        # The tag frame itself holds no audio
+        position += frame['length']
+
+    frames = 0
+    samples = 0
+    lost_bytes = 0
+    while position + 4 <= end:
+        frame = parse_frame_header(int.from_bytes(data[position:position + 4], 'big'))
+        if frame is None:
+            # Lost sync: look for the next frame and count the garbage skipped
+            resync, frame = find_first_frame(data, position + 1, end)
+            if resync is None:
+                lost_bytes += end - position
+                break
+            lost_bytes += resync - position
+            position = resync
+        if position + frame['length'] > end:
+            result['truncated'] = True
+            break
+        frames += 1
+        samples += frame['samples']
+        sample_rate = frame['sample_rate']
+        position += frame['length']
+
+    result['frames'] = frames
+    if frames:
+        result['duration'] = samples / sample_rate
+
+    if declared_frames and frames < declared_frames * (1 - TRUNCATION_TOLERANCE):
+        result['truncated'] = True
+        result['problem'] = f"Only {frames} of {declared_frames} frames present"
+    elif declared_bytes and end - start < declared_bytes * (1 - TRUNCATION_TOLERANCE):
+        result['truncated'] = True
+        result['problem'] = f"Only {end - start} of {declared_bytes} bytes present"
+    elif result['truncated']:
+        result['problem'] = "Last frame is cut off"
+    elif frames == 0:
+        result['problem'] = "No MPEG audio frames found"
+    elif lost_bytes > (end - start) * TRUNCATION_TOLERANCE:
+        result['problem'] = f"{lost_bytes} bytes of corrupt data between frames"
+    return result
+
+def duration_tolerance(expected_duration):
+    """Allowed difference in seconds between the expected and measured duration"""
+    return max(3.0, expected_duration * 0.02)
+
+def verify_mp3(file_path, expected_duration=None):
+    """
+    Check an MP3 in-process by streaming its frame headers from a memory map.
+    :param file_path: Path to the MP3 file.
+    :param expected_duration: Duration in seconds from the search/info metadata, if known.
+    :return: Tuple (ok, problem, duration); problem is None when ok.
+    """
+    try:
+        if os.path.getsize(file_path) == 0:
+            return False, "File is empty", 0.0
+        with open(file_path, 'rb') as mp3_file:
+            with mmap.mmap(mp3_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                result = scan_mp3(data)
+    except (OSError, ValueError) as e:
+        return False, f"Could not read file: {e}", 0.0
+
+    duration = result['duration']
+    if result['problem']:
+        return False, result['problem'], duration
+
+    if expected_duration:
+        if abs(duration - expected_duration) > duration_tolerance(expected_duration):
+            return False, f"Duration {duration:.0f}s does not match expected {expected_duration:.0f}s", duration
+
+    return True, None, duration
+
+def verify_mp3_job(args):
+    """Unpack (path, expected_duration) for use with a process pool"""
+    file_path, expected_duration = args
+    return (file_path,) + verify_mp3(file_path, expected_duration)
+
+def audit_library(folder, expected_durations=None, max_workers=None, remove_bad=False, log=print):
+    """
+    Verify every MP3 under a folder in parallel.
+    :param folder: Library root; searched recursively.
+    :param expected_durations: Optional dict of file path -> expected duration in seconds;
+                               without one only the file structure is checked.
+    :param max_workers: Number of worker processes (default: CPU count).
+    :param remove_bad: Delete files that fail, so the next run downloads them again.
+    :return: List of (file_path, problem, duration) for files that failed.
+    """
+    # Compared by absolute path, so a relative folder still matches recorded paths
+    expected_durations = {os.path.abspath(path): duration for path, duration in (expected_durations or {}).items()}
+    files = sorted(glob.glob(os.path.join(folder, "**", "*.mp3"), recursive=True))
+    log(f"Auditing {len(files)} MP3 files...\n")
+
+    bad = []
+    jobs = [(path, expected_durations.get(os.path.abspath(path))) for path in files]
+    log(f"Expected durations known for {sum(1 for _, duration in jobs if duration)} files\n")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for file_path, ok, problem, duration in pool.map(verify_mp3_job, jobs, chunksize=16):
+            if ok:
+                continue
+            bad.append((file_path, problem, duration))
+            log(f"❌ {os.path.relpath(file_path, folder)}: {problem}\n")
+            if remove_bad:
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    log(f"⚠️ Could not remove '{file_path}': {e}\n")
+
+    log(f"Audit complete: {len(bad)} of {len(files)} files need re-downloading\n")
+    return bad
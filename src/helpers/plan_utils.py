@@ -0,0 +1,97 @@
+import os
+import re
+import pandas as pd
+from .manifest_utils import row_hash, row_hashes
+
+# Characters that can't appear in file names on Windows/macOS/Linux
+INVALID_FILENAME_CHARS = '<>:"/\\|?*'
+
+VIDEO_ID_PATTERN = r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})'
+
+# What a run does with each row:
+#   search   - no link yet, PHASE 1 asks the user to pick a video
+#   download - has a link, PHASE 2 downloads it
+#   skip     - marked SKIPPED in the sheet
+#   invalid  - missing title or artist
+#   present  - no link, but the library already has the song (see library_utils)
+ACTIONS = ['search', 'download', 'skip', 'invalid', 'present']
+
+LINK_TYPES = ['youtube', 'other', 'skipped', 'empty']
+
+_FILENAME_TABLE = str.maketrans({char: '_' for char in INVALID_FILENAME_CHARS})
+
+# Regex replacement is several times faster than str.translate with a dict table
+_FILENAME_PATTERN = '[' + re.escape(INVALID_FILENAME_CHARS) + ']'
+
+def extract_video_id(url):
+    """Return the 11-character YouTube video ID in a link, or None"""
+    match = re.search(VIDEO_ID_PATTERN, url)
+    return match.group(1) if match else None
+
+def clean_column(series):
+    """Vectorised safe_str: NaN becomes '', everything else a stripped string"""
+    # Plain object dtype keeps the .str ops on pandas' fast path across versions
+    return series.where(series.notna(), '').astype(str).astype(object).str.strip()
+
+def sanitize_series(series):
+    """Vectorised sanitize_filename"""
+    return series.str.replace(_FILENAME_PATTERN, '_', regex=True)
+
+def classify_links(urls):
+    """
+    Label each cleaned link as 'youtube', 'skipped', 'empty' or 'other'.
+    :return: Categorical Series aligned with urls.
+    """
+    lowered = urls.str.lower()
+    link_type = pd.Series('other', index=urls.index)
+    is_youtube = lowered.str.contains('youtube.com', regex=False) | lowered.str.contains('youtu.be', regex=False)
+    link_type[is_youtube] = 'youtube'
+    link_type[lowered == 'skipped'] = 'skipped'
+    link_type[urls == ''] = 'empty'
+    return link_type.astype(pd.CategoricalDtype(LINK_TYPES))
+
+def actions_for(titles, artists, link_type):
+    """Work out the ACTIONS entry for each row from its fields and link type"""
+    action = pd.Series('download', index=link_type.index)
+    action[link_type == 'empty'] = 'search'
+    action[link_type == 'skipped'] = 'skip'
+    action[(titles == '') | (artists == '')] = 'invalid'
+    return action.astype(pd.CategoricalDtype(ACTIONS))
+
+def build_download_plan(df, download_folder):
+    """
+    Normalise a sheet and decide what to do with every row in one vectorised pass.
+    :param df: Sheet from read_music_sheet (Title | Artist | YouTube Link | Genre).
+    :param download_folder: Root folder that genre folders are created in.
+    :return: DataFrame indexed like df with columns title, artist, url, genre, link_type,
+             video_id, output_path, hash and action.
+    """
+    plan = pd.DataFrame(index=df.index)
+    plan['title'] = clean_column(df['Title'])
+    plan['artist'] = clean_column(df['Artist'])
+    plan['url'] = clean_column(df['YouTube Link'])
+    plan['genre'] = clean_column(df['Genre'])
+
+    plan['link_type'] = classify_links(plan['url'])
+    plan['video_id'] = plan['url'].str.extract(VIDEO_ID_PATTERN, expand=False).fillna('')
+
+    # Genre folders are few, so sanitise and join each once with os.path.join semantics
+    genre_folders = {genre: os.path.join(download_folder, genre.translate(_FILENAME_TABLE), '')
+                     for genre in plan['genre'].unique()}
+    # '(', ')', ' ' and '.' are never replaced, so one pass over the whole name is enough
+    file_names = sanitize_series(plan['title'] + ' (' + plan['artist'] + ').mp3')
+    plan['output_path'] = plan['genre'].map(genre_folders) + file_names
+
+    plan['hash'] = row_hashes(*(plan[column].tolist() for column in ['title', 'artist', 'url', 'genre']))
+    plan['action'] = actions_for(plan['title'], plan['artist'], plan['link_type'])
+    return plan
+
+def set_plan_link(plan, index, url):
+    """Update one row of the plan after PHASE 1 picked a link (or SKIPPED) for it"""
+    urls = pd.Series([url], index=[index])
+    plan.at[index, 'url'] = url
+    plan.at[index, 'link_type'] = classify_links(urls)[index]
+    plan.at[index, 'video_id'] = extract_video_id(url) or ''
+    plan.at[index, 'hash'] = row_hash(plan.at[index, 'title'], plan.at[index, 'artist'], url, plan.at[index, 'genre'])
+    plan.at[index, 'action'] = actions_for(plan.loc[[index], 'title'], plan.loc[[index], 'artist'],
+                                           plan.loc[[index], 'link_type'])[index]
@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from .schedule_utils import find_sheets, build_jobs, order_jobs, run_job, write_sheet_results
+from .metadata_utils import add_metadata
+
+# How long a worker owns a job before other workers may take it over
+DEFAULT_LEASE_SECONDS = 600
+
+# A job that keeps failing is given up on after this many claims
+MAX_ATTEMPTS = 3
+
+class WorkQueue:
+    """
+    Durable job queue in a SQLite file that several worker processes can share.
+    Jobs are claimed with a lease; if a worker dies, its lease expires and the job
+    is handed to another worker. Put the file on local disk or a share with working
+    POSIX locks (SQLite locking is unreliable on some network filesystems).
+    """
+
+    def __init__(self, db_path, timeout=30):
+        self.db_path = db_path
+        # Autocommit mode; transactions are opened explicitly where needed
+        self.conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                job_key TEXT UNIQUE,
+                seq INTEGER,
+                payload TEXT,
+                status TEXT DEFAULT 'queued',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER DEFAULT 0,
+                result TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS row_status (
+                sheet TEXT,
+                row_index INTEGER,
+                status TEXT,
+                PRIMARY KEY (sheet, row_index)
+            )
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, jobs):
+        """
+        Add jobs in run order. A job whose video is already queued gets the new rows merged
+        into its targets; it is queued again if it had failed or has rows it hasn't served yet.
+        :return: Number of jobs added or queued again.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            start = self.conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM jobs").fetchone()[0]
+            queued = 0
+            for offset, job in enumerate(jobs):
+                row = self.conn.execute(
+                    "SELECT id, payload, status FROM jobs WHERE job_key = ?", (job['key'],)
+                ).fetchone()
+                if row is None:
+                    self.conn.execute(
+                        "INSERT INTO jobs (job_key, seq, payload) VALUES (?, ?, ?)",
+                        (job['key'], start + offset, json.dumps(job))
+                    )
+                    queued += 1
+                    continue
+
+                job_id, payload, status = row
+                existing = json.loads(payload)
+                targets = {(t['sheet'], t['row_index']): t for t in existing['targets']}
+                new_rows = [t for t in job['targets'] if (t['sheet'], t['row_index']) not in targets]
+                targets.update({(t['sheet'], t['row_index']): t for t in job['targets']})
+                existing['targets'] = list(targets.values())
+                self.conn.execute("UPDATE jobs SET payload = ? WHERE id = ?", (json.dumps(existing), job_id))
+
+                # A leased job picks up new rows when it completes (see complete)
+                if status == 'failed' or (status == 'done' and new_rows):
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL, "
+                        "attempts = 0, seq = ? WHERE id = ?",
+                        (start + offset, job_id)
+                    )
+                    queued += 1
+            self.conn.execute("COMMIT")
+            return queued
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def set_row_statuses(self, sheet, row_statuses):
+        """Record statuses for rows that were settled without a job (e.g. 'Needs search')"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO row_status (sheet, row_index, status) VALUES (?, ?, ?)",
+            [(sheet, int(row_index), status) for row_index, status in row_statuses.items()]
+        )
+
+    def requeue_expired(self, max_attempts=MAX_ATTEMPTS):
+        """
+        Put jobs whose lease ran out back in the queue. A job whose worker has died or hung
+        on every one of its max_attempts claims is failed instead of handed out again.
+        :return: Number of jobs requeued.
+        """
+        now = time.time()
+        self.conn.execute(
+            "UPDATE jobs SET status = 'failed', worker = NULL, lease_expires = NULL, result = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (json.dumps(f"Lease expired {max_attempts} times"), now, max_attempts)
+        )
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now,)
+        )
+        return cursor.rowcount
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Take the next queued job.
+        :return: Tuple (job_id, job) or None if nothing is waiting.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.requeue_expired()
+            row = self.conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY seq LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker_id, time.time() + lease_seconds, row[0])
+            )
+            self.conn.execute("COMMIT")
+            return row[0], json.loads(row[1])
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def extend_lease(self, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Renew a lease; returns False if the job is no longer held by this worker"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, results):
+        """
+        Store a finished job's per-row results.
+        If rows were merged into the job while it ran, it is queued again to serve them.
+        :param results: Dict of (sheet, row_index) -> status string.
+        :return: False if the lease had been lost to another worker.
+        """
+        rows = [[sheet, row_index, status] for (sheet, row_index), status in results.items()]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT payload FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return False
+            targets = json.loads(row[0])['targets']
+            served = all((t['sheet'], t['row_index']) in results for t in targets)
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, worker = CASE WHEN ? THEN worker END, "
+                "lease_expires = NULL WHERE id = ?",
+                ('done' if served else 'queued', json.dumps(rows), served, job_id)
+            )
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def fail(self, job_id, worker_id, error, max_attempts=MAX_ATTEMPTS):
+        """Release a job after an error; it is retried until it has been claimed max_attempts times"""
+        self.conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "worker = NULL, lease_expires = NULL, result = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (max_attempts, json.dumps(str(error)), job_id, worker_id)
+        )
+
+    def counts(self):
+        """Return a dict of job status -> number of jobs"""
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def row_results(self):
+        """
+        Gather per-row outcomes of every job and settled row.
+        :return: Dict of sheet -> {row_index: status}.
+        """
+        statuses = {}
+        for sheet, row_index, status in self.conn.execute("SELECT sheet, row_index, status FROM row_status"):
+            statuses.setdefault(sheet, {})[row_index] = status
+
+        for status, payload, result in self.conn.execute("SELECT status, payload, result FROM jobs"):
+            job = json.loads(payload)
+            if status == 'done':
+                for sheet, row_index, row_status in json.loads(result):
+                    statuses.setdefault(sheet, {})[row_index] = row_status
+                continue
+            if status == 'failed':
+                row_status = f"Failed: {json.loads(result)}"
+            else:
+                row_status = "Pending"
+            for target in job['targets']:
+                statuses.setdefault(target['sheet'], {})[target['row_index']] = row_status
+        return statuses
+
+def default_worker_id():
+    """Identify a worker by host and process so leases can be traced"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue_sheets(queue_path, paths, download_folder, policy='priority', priorities=None,
+                   duration_lookup=None, log=print):
+    """
+    Coordinator step: turn workbooks into queued jobs.
+    :param queue_path: SQLite file shared by the workers.
+    :param paths: Workbook paths and/or folders of workbooks.
+    :param download_folder: Shared library root the workers download into.
+    :return: Number of jobs added to the queue.
+    """
+    # Absolute paths so results can be written back whichever directory collect runs from
+    sheets = [os.path.abspath(sheet) for sheet in find_sheets(paths)]
+    jobs, row_statuses = build_jobs(sheets, download_folder, priorities, log)
+    jobs = order_jobs(jobs, policy, duration_lookup)
+
+    # Row indices from pandas may be numpy ints, which json can't encode
+    for job in jobs:
+        for target in job['targets']:
+            target['row_index'] = int(target['row_index'])
+
+    queue = WorkQueue(queue_path)
+    try:
+        added = queue.enqueue(jobs)
+        for sheet, statuses in row_statuses.items():
+            queue.set_row_statuses(sheet, statuses)
+    finally:
+        queue.close()
+
+    log(f"Queued {added} new or updated jobs from {len(sheets)} workbooks\n")
+    return added
+
+def run_worker(queue_path, download_folder, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+               poll_interval=2, exit_when_empty=True, add_metadata_func=add_metadata, log=print,
+               allow_video=False):
+    """
+    Worker loop: claim jobs, download them into the shared library and report back.
+    A background thread renews the lease while a download is running.
+    :param exit_when_empty: Stop once nothing is queued or leased; otherwise keep polling.
+    :param allow_video: Fall back to formats with a video track when no audio-only format exists.
+    :return: Number of jobs this worker completed.
+    """
+    worker_id = worker_id or default_worker_id()
+    queue = WorkQueue(queue_path)
+    completed = 0
+    log(f"Worker {worker_id} started\n")
+
+    try:
+        while True:
+            claimed = queue.claim(worker_id, lease_seconds)
+            if claimed is None:
+                counts = queue.counts()
+                if exit_when_empty and not counts.get('queued') and not counts.get('leased'):
+                    break
+                # Other workers may still crash and hand their jobs back
+                time.sleep(poll_interval)
+                continue
+
+            job_id, job = claimed
+            stop_heartbeat = threading.Event()
+
+            def heartbeat():
+                # sqlite connections can't be shared across threads, so open a separate one
+                heartbeat_queue = WorkQueue(queue_path)
+                try:
+                    while not stop_heartbeat.wait(lease_seconds / 3):
+                        heartbeat_queue.extend_lease(job_id, worker_id, lease_seconds)
+                finally:
+                    heartbeat_queue.close()
+
+            heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+            heartbeat_thread.start()
+            try:
+                results = run_job(job, download_folder, add_metadata_func, log, allow_video)
+            except Exception as e:
+                stop_heartbeat.set()
+                heartbeat_thread.join()
+                queue.fail(job_id, worker_id, e)
+                log(f"❌ Job {job['key']} failed: {e}\n")
+                continue
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+            # A failed download is handed back so another attempt (maybe on another host) can retry it
+            failures = [status for status in results.values() if status.startswith("Failed")]
+            if len(failures) == len(results):
+                queue.fail(job_id, worker_id, failures[0][len("Failed: "):])
+                continue
+
+            if queue.complete(job_id, worker_id, results):
+                completed += 1
+            else:
+                log(f"⚠️ Lease on job {job['key']} was lost before it finished\n")
+    finally:
+        queue.close()
+
+    log(f"Worker {worker_id} finished {completed} jobs\n")
+    return completed
+
+def collect_results(queue_path, log=print):
+    """
+    Coordinator step: write every row's outcome back to its workbook.
+    :return: Dict of sheet -> {row_index: status}.
+    """
+    queue = WorkQueue(queue_path)
+    try:
+        counts = queue.counts()
+        statuses = queue.row_results()
+    finally:
+        queue.close()
+
+    log(f"Queue status: {', '.join(f'{k}={v}' for k, v in sorted(counts.items())) or 'empty'}\n")
+    for sheet, row_statuses in statuses.items():
+        success, error = write_sheet_results(sheet, row_statuses)
+        if success:
+            log(f"✅ Updated '{os.path.basename(sheet)}' with {len(row_statuses)} row statuses\n")
+        else:
+            log(f"⚠️ Failed to update '{os.path.basename(sheet)}': {error}\n")
+    return statuses
@@ -0,0 +1,263 @@
+import os
+import glob
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import openpyxl
+import pandas as pd
+from .download_utils import (
+    STATUS_COLUMN, sanitize_filename, get_safe_filepath, read_music_sheet, download_song, has_sheet_headers,
+    is_status_column
+)
+from .plan_utils import build_download_plan
+from .library_utils import LibraryIndex, reconcile_plan
+from .metadata_utils import add_metadata
+from .cache_utils import get_info_cache
+
+# Ordering policies for the global queue
+POLICIES = ['priority', 'shortest', 'round_robin']
+
+def find_sheets(paths):
+    """
+    Expand a mix of Excel files and folders into a list of workbook paths.
+    :param paths: Iterable of file or folder paths.
+    :return: List of .xlsx paths in the order given (folders sorted by name).
+    """
+    sheets = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob.glob(os.path.join(path, "*.xlsx")))
+        else:
+            found = [path]
+        for sheet in found:
+            # Skip Excel lock files like "~$Music.xlsx"
+            if os.path.basename(sheet).startswith("~$"):
+                continue
+            if sheet not in sheets:
+                sheets.append(sheet)
+    return sheets
+
+def build_jobs(sheet_paths, download_folder, priorities=None, log=print):
+    """
+    Merge the rows of several sheets into one deduplicated job list.
+    Rows pointing at the same video become one job with several targets, so the
+    video is fetched once and copied to every place it is wanted.
+    :param sheet_paths: List of workbook paths.
+    :param download_folder: Root folder that genre folders are created in.
+    :param priorities: Optional dict of workbook path -> priority (lower runs first).
+    :param log: Callable receiving progress messages.
+    :return: Tuple (jobs, row_statuses); row_statuses maps sheet -> {row_index: status}
+             for rows that were settled without a download.
+    """
+    # Priorities may be given by full path or just the workbook's file name
+    priorities = priorities or {}
+    path_priorities = {os.path.abspath(path): value for path, value in priorities.items()}
+    name_priorities = {path: value for path, value in priorities.items() if os.path.basename(path) == path}
+    jobs = {}
+    claimed_paths = set()
+    row_statuses = {}
+    library = None
+
+    for sheet_order, sheet in enumerate(sheet_paths):
+        row_statuses[sheet] = {}
+        try:
+            df, error = read_music_sheet(sheet, log)
+        except Exception as e:
+            df, error = None, str(e)
+        if df is None:
+            log(f"❌ Skipping workbook '{sheet}': {error}\n")
+            continue
+
+        sheet_priority = path_priorities.get(os.path.abspath(sheet),
+                                             name_priorities.get(os.path.basename(sheet), 0))
+        sheet_rank = 0
+        plan = build_download_plan(df, download_folder)
+        if (plan['action'] == 'search').any():
+            # Built once, on the first sheet that has rows without links
+            library = library or LibraryIndex(download_folder)
+            reconcile_plan(plan, library, log)
+        for index in plan.index[plan['action'] == 'present']:
+            row_statuses[sheet][index] = "Present locally"
+        # Picking a video for a row without a link needs the search dialog, so leave those for the GUI
+        for index in plan.index[plan['action'] == 'search']:
+            row_statuses[sheet][index] = "Needs search"
+
+        # Any other link (SoundCloud etc.) is downloaded as-is, like download_music does
+        for row in plan[plan['action'] == 'download'].itertuples():
+            if row.output_path in claimed_paths:
+                row_statuses[sheet][row.Index] = "Duplicate"
+                continue
+            claimed_paths.add(row.output_path)
+
+            target = {'sheet': sheet, 'row_index': row.Index, 'title': row.title, 'artist': row.artist,
+                      'genre': row.genre, 'output_path': row.output_path}
+            key = row.video_id or row.url
+            if key in jobs:
+                jobs[key]['targets'].append(target)
+                continue
+
+            jobs[key] = {
+                'key': key,
+                'url': row.url,
+                'targets': [target],
+                'priority': sheet_priority,
+                'sheet_order': sheet_order,
+                'sheet_rank': sheet_rank,
+                'duration': None,
+            }
+            sheet_rank += 1
+
+        log(f"📄 {os.path.basename(sheet)}: {len(df)} rows\n")
+
+    return list(jobs.values()), row_statuses
+
+def order_jobs(jobs, policy='priority', duration_lookup=None):
+    """
+    Sort jobs for the shared pool.
+    :param policy: 'priority' (lower sheet priority first, then sheet order),
+                   'shortest' (shortest expected duration first, unknown durations last),
+                   or 'round_robin' (one job from each sheet in turn).
+    :param duration_lookup: Optional callable url -> expected duration in seconds (or None);
+                            defaults to the metadata in the info cache.
+    :return: New list of jobs in run order.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy '{policy}'. Expected one of: {', '.join(POLICIES)}")
+
+    if policy == 'priority':
+        return sorted(jobs, key=lambda job: (job['priority'], job['sheet_order'], job['sheet_rank']))
+
+    if policy == 'shortest':
+        duration_lookup = duration_lookup or get_info_cache().cached_duration
+        for job in jobs:
+            if job['duration'] is None and duration_lookup:
+                job['duration'] = duration_lookup(job['url'])
+        return sorted(jobs, key=lambda job: (job['duration'] is None, job['duration'] or 0,
+                                             job['sheet_order'], job['sheet_rank']))
+
+    # Round-robin: the n-th job of every sheet runs before the (n+1)-th of any sheet
+    return sorted(jobs, key=lambda job: (job['sheet_rank'], job['priority'], job['sheet_order']))
+
+def run_job(job, download_folder, add_metadata_func, log=print, allow_video=False):
+    """
+    Download a job once and copy the file to every other target.
+    :param allow_video: Fall back to formats with a video track when no audio-only format exists.
+    :return: Dict of (sheet, row_index) -> status string.
+    """
+    first = job['targets'][0]
+    status, detail = download_song(job['url'], first['title'], first['artist'], first['genre'],
+                                   download_folder, add_metadata_func, log, allow_video)
+    if status == 'failed':
+        return {(t['sheet'], t['row_index']): f"Failed: {detail}" for t in job['targets']}
+
+    results = {(first['sheet'], first['row_index']): "Downloaded" if status == 'downloaded' else "Exists"}
+    for target in job['targets'][1:]:
+        key = (target['sheet'], target['row_index'])
+        # Rebuilt from this process's download folder, which may be mounted elsewhere than the coordinator's
+        output_path = get_safe_filepath(target['title'], target['artist'],
+                                        os.path.join(download_folder, sanitize_filename(target['genre'])))
+        if os.path.exists(output_path):
+            results[key] = "Exists"
+            continue
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.copy2(detail, output_path)
+            add_metadata_func(output_path, target['title'], target['artist'])
+            results[key] = "Copied"
+        except Exception as e:
+            results[key] = f"Failed: {e}"
+    return results
+
+def status_column_number(excel_path, headers):
+    """
+    1-based column that holds (or will hold) the statuses, as pandas sees the first worksheet.
+    :param headers: Whether the sheet has a header row (see has_sheet_headers).
+    """
+    if headers:
+        columns = list(pd.read_excel(excel_path, nrows=0).columns)
+        if STATUS_COLUMN in columns:
+            return columns.index(STATUS_COLUMN) + 1
+        return len(columns) + 1
+    raw = pd.read_excel(excel_path, header=None)
+    if raw.shape[1] in (5, 6) and is_status_column(raw.iloc[:, -1]):
+        return raw.shape[1]
+    return raw.shape[1] + 1
+
+def write_sheet_results(excel_path, row_statuses):
+    """
+    Write per-row statuses into the workbook's 'Download Status' column.
+    Only those cells change, so the sheet keeps its layout (including headerless and
+    two-link layouts) and other worksheets are kept.
+    :param row_statuses: Dict of row_index -> status string, indexed like read_music_sheet.
+    :return: Tuple (success, error_msg).
+    """
+    try:
+        headers = has_sheet_headers(excel_path)
+        column = status_column_number(excel_path, headers)
+        # Row 1 is the header row, if there is one
+        first_row = 2 if headers else 1
+
+        workbook = openpyxl.load_workbook(excel_path)
+        worksheet = workbook.worksheets[0]  # The sheet pandas reads
+        if headers:
+            worksheet.cell(row=1, column=column, value=STATUS_COLUMN)
+        for row_index, status in row_statuses.items():
+            worksheet.cell(row=first_row + int(row_index), column=column, value=status)
+        workbook.save(excel_path)
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+def run_schedule(paths, download_folder, policy='priority', max_workers=4, priorities=None,
+                 duration_lookup=None, add_metadata_func=add_metadata, log=print, allow_video=False):
+    """
+    Download the rows of many sheets on one shared worker pool.
+    :param paths: Workbook paths and/or folders of workbooks.
+    :param download_folder: Root folder that genre folders are created in.
+    :param policy: Queue ordering policy, one of POLICIES.
+    :param max_workers: Number of concurrent downloads.
+    :param priorities: Optional dict of workbook path -> priority (lower runs first).
+    :param duration_lookup: Optional callable url -> expected duration, used by 'shortest'.
+    :param allow_video: Fall back to formats with a video track when no audio-only format exists.
+    :return: Dict of sheet -> {row_index: status}.
+    """
+    sheets = find_sheets(paths)
+    if not sheets:
+        log("❌ No Excel files found\n")
+        return {}
+
+    log(f"📚 Scheduling {len(sheets)} workbooks with policy '{policy}'\n")
+    jobs, row_statuses = build_jobs(sheets, download_folder, priorities, log)
+    jobs = order_jobs(jobs, policy, duration_lookup)
+    log(f"Queued {len(jobs)} unique downloads\n")
+
+    # Messages from worker threads are serialised so lines don't interleave
+    log_lock = threading.Lock()
+
+    def locked_log(msg):
+        with log_lock:
+            log(msg)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_job, job, download_folder, add_metadata_func, locked_log, allow_video): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            job = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                results = {(t['sheet'], t['row_index']): f"Failed: {e}" for t in job['targets']}
+            for (sheet, row_index), status in results.items():
+                row_statuses[sheet][row_index] = status
+            locked_log(f"Progress: {done}/{len(jobs)}\n")
+
+    # Write back once per workbook, from this thread only
+    for sheet, statuses in row_statuses.items():
+        if not statuses:
+            continue
+        success, error = write_sheet_results(sheet, statuses)
+        if success:
+            log(f"✅ Updated '{os.path.basename(sheet)}' with {len(statuses)} row statuses\n")
+        else:
+            log(f"⚠️ Failed to update '{os.path.basename(sheet)}': {error}\n")
+
+    return row_statuses
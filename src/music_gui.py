@@ -3,7 +3,6 @@ import threading
 from tkinter import filedialog, messagebox, ttk
 import os
 import subprocess
-from helpers.download_utils import download_music
 from helpers.metadata_utils import add_metadata
 import os.path
 
@@ -11,7 +10,7 @@ class MusicDownloaderApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Music Downloader")
-        self.root.geometry("600x450")
+        self.root.geometry("760x480")
 
         self.skip_current = False
         self.download_in_progress = False
@@ -38,6 +37,25 @@ class MusicDownloaderApp:
         self.folder_entry = tk.Entry(root, textvariable=self.folder_path, width=50)
         self.folder_entry.pack(pady=5)
 
+        self.options_frame = tk.Frame(root)
+        self.options_frame.pack(pady=5)
+        self.incremental = tk.BooleanVar(value=True)
+        self.incremental_check = tk.Checkbutton(self.options_frame, text="Only process changed rows",
+                                                variable=self.incremental, command=self.update_options)
+        self.incremental_check.pack(side=tk.LEFT, padx=5)
+        self.prune_removed = tk.BooleanVar(value=False)
+        self.prune_check = tk.Checkbutton(self.options_frame, text="Delete files of removed rows",
+                                          variable=self.prune_removed)
+        self.prune_check.pack(side=tk.LEFT, padx=5)
+        self.reconcile_library = tk.BooleanVar(value=True)
+        self.reconcile_check = tk.Checkbutton(self.options_frame, text="Match existing files",
+                                              variable=self.reconcile_library)
+        self.reconcile_check.pack(side=tk.LEFT, padx=5)
+        self.allow_video = tk.BooleanVar(value=False)
+        self.allow_video_check = tk.Checkbutton(self.options_frame, text="Allow video formats",
+                                                variable=self.allow_video)
+        self.allow_video_check.pack(side=tk.LEFT, padx=5)
+
         self.button_frame = tk.Frame(root)
         self.button_frame.pack(pady=10)
 
@@ -61,6 +79,27 @@ class MusicDownloaderApp:
         self.status_text.pack(pady=10, padx=10)
         self.status_text.insert(tk.END, "Status: Waiting for user input...\n")
 
+        # Warm up pandas/yt_dlp in the background once the window is on screen
+        self.root.after(500, self.preload_download_modules)
+
+    def preload_download_modules(self):
+        """Import the heavy download modules off the main thread so the first run starts quickly"""
+        def preload():
+            try:
+                import helpers.download_utils  # noqa: F401
+            except Exception as e:
+                print(f"Background preload failed: {e}")
+
+        threading.Thread(target=preload, daemon=True).start()
+
+    def update_options(self):
+        """Pruning relies on the sync manifest, so it is only available with incremental sync"""
+        if self.incremental.get():
+            self.prune_check.config(state=tk.NORMAL)
+        else:
+            self.prune_removed.set(False)
+            self.prune_check.config(state=tk.DISABLED)
+
     def select_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx")])
         self.file_path.set(file_path)
@@ -110,6 +149,9 @@ class MusicDownloaderApp:
     def download_thread(self):
         try:
             self.root.after(0, lambda: self.skip_button.config(state=tk.NORMAL))
+
+            # Imported here rather than at module load to keep startup fast
+            from helpers.download_utils import download_music
             
             success = download_music(
                 self.file_path.get(),
@@ -118,7 +160,11 @@ class MusicDownloaderApp:
                 self.progress_bar,
                 self.progress_text,
                 self.root,
-                add_metadata
+                add_metadata,
+                incremental=self.incremental.get(),
+                prune_removed=self.prune_removed.get(),
+                reconcile_library=self.reconcile_library.get(),
+                allow_video=self.allow_video.get()
             )
             
             if success:
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import pandas as pd
+from helpers.plan_utils import build_download_plan
+
+# Sheet size the plan has to handle quickly
+BENCHMARK_ROWS = 100_000
+
+# Time allowed for building the plan of BENCHMARK_ROWS rows, in seconds
+PLAN_BUDGET_S = 1.0
+
+def make_sheet(rows=BENCHMARK_ROWS):
+    """
+    Build a synthetic sheet with the mix of rows real sheets have: YouTube links,
+    empty links, SKIPPED rows, other sites and rows missing a title or artist.
+    """
+    titles, artists, links, genres = [], [], [], []
+    for i in range(rows):
+        kind = i % 10
+        titles.append("" if kind == 9 else f"Song {i}: Part/{i % 7}")
+        artists.append(f"Artist {i % 997}")
+        if kind < 6:
+            links.append(f"https://www.youtube.com/watch?v={i:011d}")
+        elif kind == 6:
+            links.append("SKIPPED")
+        elif kind == 7:
+            links.append(f"https://soundcloud.com/artist/song-{i}")
+        else:
+            links.append(None)
+        genres.append(["Pop", "Rock", "Hip Hop", "R&B", "Jazz?"][i % 5])
+    return pd.DataFrame({'Title': titles, 'Artist': artists, 'YouTube Link': links, 'Genre': genres})
+
+def measure_plan_time(rows=BENCHMARK_ROWS, repeats=3):
+    """
+    Time build_download_plan on a synthetic sheet.
+    :return: Best time in seconds over the repeats.
+    """
+    df = make_sheet(rows)
+    download_folder = os.path.join(os.path.expanduser("~"), "Music")
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        build_download_plan(df, download_folder)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def check_plan_budget(budget_s=PLAN_BUDGET_S, rows=BENCHMARK_ROWS):
+    """Check plan build time against the budget and return a list of problems"""
+    elapsed = measure_plan_time(rows)
+    print(f"Plan for {rows} rows: {elapsed * 1000:.0f} ms (budget {budget_s * 1000:.0f} ms)")
+    if elapsed > budget_s:
+        return [f"Building the plan took {elapsed * 1000:.0f} ms (budget {budget_s * 1000:.0f} ms)"]
+    return []
+
+if __name__ == "__main__":
+    problems = check_plan_budget()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Plan within budget")
@@ -0,0 +1,51 @@
+import argparse
+import os
+from helpers.schedule_utils import POLICIES
+from helpers.queue_utils import DEFAULT_LEASE_SECONDS, enqueue_sheets, run_worker, collect_results, WorkQueue
+from batch_download import parse_priorities
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed downloads over a shared SQLite work queue")
+    parser.add_argument("--queue", required=True, help="Path to the shared queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Queue the rows of one or more workbooks")
+    enqueue_parser.add_argument("paths", nargs="+", help="Excel files and/or folders of Excel files")
+    enqueue_parser.add_argument("--folder", default=os.path.expanduser("~/Documents/Music/Stock"),
+                                help="Shared download folder (default: ~/Documents/Music/Stock)")
+    enqueue_parser.add_argument("--policy", choices=POLICIES, default="priority", help="Queue ordering policy")
+    enqueue_parser.add_argument("--priority", action="append", metavar="SHEET=N",
+                                help="Priority for a workbook, lower runs first (repeatable)")
+
+    work_parser = commands.add_parser("work", help="Run a worker until the queue is drained")
+    work_parser.add_argument("--folder", default=os.path.expanduser("~/Documents/Music/Stock"),
+                             help="Shared download folder (default: ~/Documents/Music/Stock)")
+    work_parser.add_argument("--lease", type=int, default=DEFAULT_LEASE_SECONDS, help="Lease length in seconds")
+    work_parser.add_argument("--worker-id", help="Worker name (default: host:pid)")
+    work_parser.add_argument("--forever", action="store_true", help="Keep polling after the queue is empty")
+    work_parser.add_argument("--allow-video", action="store_true",
+                             help="Extract audio from video formats when a link has no audio-only format")
+
+    commands.add_parser("collect", help="Write results back to the workbooks")
+    commands.add_parser("status", help="Show job counts")
+
+    args = parser.parse_args()
+    log = lambda msg: print(msg, end="", flush=True)
+
+    if args.command == "enqueue":
+        enqueue_sheets(args.queue, args.paths, args.folder, args.policy, parse_priorities(args.priority), log=log)
+    elif args.command == "work":
+        run_worker(args.queue, args.folder, args.worker_id, args.lease, exit_when_empty=not args.forever, log=log,
+                   allow_video=args.allow_video)
+    elif args.command == "collect":
+        collect_results(args.queue, log=log)
+    else:
+        queue = WorkQueue(args.queue)
+        try:
+            for status, count in sorted(queue.counts().items()):
+                print(f"{status}: {count}")
+        finally:
+            queue.close()
+
+if __name__ == "__main__":
+    main()
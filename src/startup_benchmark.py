@@ -0,0 +1,62 @@
+import os
+import re
+import subprocess
+import sys
+
+# Modules that must not be imported before the window appears
+HEAVY_MODULES = ['pandas', 'yt_dlp', 'openpyxl']
+
+# Cumulative import time allowed for the GUI module, in milliseconds
+STARTUP_BUDGET_MS = 300
+
+def measure_import_time(module_name="music_gui"):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+    :param module_name: Module to import from the src directory.
+    :return: Tuple (total_ms, imported_modules) for the import.
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=src_dir,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module_name} failed:\n{result.stderr}")
+
+    # Lines look like: "import time:   self [us] |  cumulative | imported package"
+    total_us = 0
+    imported = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if not match:
+            continue
+        imported.append(match.group(4))
+        # Top-level imports have the smallest indentation, so sum those
+        if len(match.group(3)) == 1:
+            total_us += int(match.group(2))
+    return total_us / 1000, imported
+
+def check_startup_budget(budget_ms=STARTUP_BUDGET_MS):
+    """Check GUI import cost against the budget and return a list of problems"""
+    total_ms, imported = measure_import_time()
+    problems = []
+
+    for module in HEAVY_MODULES:
+        if module in imported:
+            problems.append(f"{module} is imported at startup")
+
+    if total_ms > budget_ms:
+        problems.append(f"Startup imports took {total_ms:.0f} ms (budget {budget_ms} ms)")
+
+    print(f"Startup import time: {total_ms:.0f} ms (budget {budget_ms} ms)")
+    return problems
+
+if __name__ == "__main__":
+    problems = check_startup_budget()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Startup within budget")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app runs from src/ (python src/music_gui.py), so tests import it the same way
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import pytest
+import yt_dlp
+from helpers import cache_utils, download_utils
+from helpers.cache_utils import InfoCache, RESOLVED_TTL, EXPIRY_MARGIN, STATIC_TTL
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "info_cache")
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+def stream_info(expire=None):
+    query = f"?expire={expire}" if expire else "?itag=251"
+    return {'id': 'dQw4w9WgXcQ', 'title': 'Song', 'uploader': 'Artist', 'duration': 200,
+            'formats': [{'format_id': '251', 'url': f"https://example.googlevideo.com/videoplayback{query}"}]}
+
+@pytest.fixture
+def replay_cache(tmp_path, monkeypatch):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='replay', fixture_dir=FIXTURE_DIR)
+    monkeypatch.setattr(cache_utils, "_info_cache", cache)
+    return cache
+
+def test_replay_resolves_from_fixture_without_ydl(replay_cache):
+    info, from_cache = replay_cache.resolve("https://youtu.be/dQw4w9WgXcQ", None)
+    assert from_cache
+    assert info['title'] == "Never Gonna Give You Up"
+    assert [fmt['format_id'] for fmt in info['formats']] == ['139', '251']
+
+def test_replay_miss_raises(replay_cache):
+    with pytest.raises(RuntimeError):
+        replay_cache.resolve("https://www.youtube.com/watch?v=aaaaaaaaaaa", None)
+
+def test_replay_fills_cached_duration(replay_cache):
+    assert replay_cache.cached_duration(URL) is None
+    replay_cache.resolve(URL, None)
+    assert replay_cache.cached_duration(URL) == 212
+    assert replay_cache.cached_duration("https://www.youtube.com/shorts/dQw4w9WgXcQ") == 212
+
+def test_search_youtube_replays_recorded_search(replay_cache):
+    results = download_utils.search_youtube("Never Gonna Give You Up", "Rick Astley")
+    assert [result['id'] for result in results] == ['dQw4w9WgXcQ', 'lYBUbBu4W08']
+    # Search results feed the static metadata, so durations are known before any download
+    assert replay_cache.cached_duration("https://www.youtube.com/watch?v=lYBUbBu4W08") == 414
+
+def test_download_with_ytdlp_uses_fixture_in_replay(replay_cache, monkeypatch):
+    # Replay covers the info only; the media download is stubbed like any offline test must
+    processed = []
+    monkeypatch.setattr(yt_dlp.YoutubeDL, "process_ie_result",
+                        lambda ydl, info, download=True: processed.append(info['id']) or info)
+    success, error, info = download_utils.download_with_ytdlp(URL, "/nonexistent", "temp")
+    assert success, error
+    assert processed == ['dQw4w9WgXcQ']
+    assert info['duration'] == 212
+
+def test_resolved_ttl_without_expiry(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    cache.put_resolved('dQw4w9WgXcQ', stream_info())
+    entry = cache.resolved['dQw4w9WgXcQ']
+    assert entry['expires_at'] - entry['fetched_at'] == pytest.approx(RESOLVED_TTL)
+
+def test_resolved_ttl_capped_by_stream_expiry(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    expire = int(time.time()) + 3600
+    cache.put_resolved('dQw4w9WgXcQ', stream_info(expire))
+    assert cache.resolved['dQw4w9WgXcQ']['expires_at'] == expire - EXPIRY_MARGIN
+
+def test_expired_entry_is_a_miss_and_deleted(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    # Stream URLs that expire within the margin are never served
+    cache.put_resolved('dQw4w9WgXcQ', stream_info(int(time.time()) + 60))
+    assert cache.get_resolved('dQw4w9WgXcQ') is None
+    assert not os.path.exists(cache.resolved_path('dQw4w9WgXcQ'))
+
+def test_fresh_entry_survives_restart(tmp_path):
+    InfoCache(cache_dir=str(tmp_path), mode='live').put_resolved('dQw4w9WgXcQ', stream_info())
+    info = InfoCache(cache_dir=str(tmp_path), mode='live').get_resolved('dQw4w9WgXcQ')
+    assert info['title'] == 'Song'
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    os.makedirs(os.path.dirname(cache.resolved_path('dQw4w9WgXcQ')))
+    with open(cache.resolved_path('dQw4w9WgXcQ'), 'w') as entry_file:
+        json.dump({'info': {}}, entry_file)
+    assert cache.get_resolved('dQw4w9WgXcQ') is None
+    assert not os.path.exists(cache.resolved_path('dQw4w9WgXcQ'))
+
+def test_static_metadata_expires(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    cache.put_static('dQw4w9WgXcQ', {'title': 'Song', 'duration': 200})
+    assert cache.cached_duration(URL) == 200
+    cache.static['dQw4w9WgXcQ']['fetched_at'] -= STATIC_TTL
+    assert cache.cached_duration(URL) is None
+
+def test_sweep_deletes_old_files(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    cache.put_resolved('dQw4w9WgXcQ', stream_info())
+    cache.put_resolved('lYBUbBu4W08', stream_info())
+    old = time.time() - RESOLVED_TTL - 1
+    os.utime(cache.resolved_path('lYBUbBu4W08'), (old, old))
+
+    assert cache.sweep() == 1
+    assert os.path.exists(cache.resolved_path('dQw4w9WgXcQ'))
+    assert not os.path.exists(cache.resolved_path('lYBUbBu4W08'))
+
+def test_resolved_memory_is_bounded(tmp_path):
+    cache = InfoCache(cache_dir=str(tmp_path), mode='live')
+    keys = [f"video{n:06d}" for n in range(cache_utils.RESOLVED_MEMORY_ENTRIES + 5)]
+    for key in keys:
+        cache.put_resolved(key, stream_info())
+    assert list(cache.resolved) == keys[5:]
+
+    # Evicted entries are still served from disk
+    assert cache.get_resolved(keys[0])['title'] == 'Song'
+    assert next(reversed(cache.resolved)) == keys[0]
+
+def test_missing_audio_only_format_names_the_setting(replay_cache, monkeypatch):
+    def no_format(ydl, info, download=True):
+        raise yt_dlp.utils.DownloadError("ERROR: [youtube] dQw4w9WgXcQ: Requested format is not available")
+    monkeypatch.setattr(yt_dlp.YoutubeDL, "process_ie_result", no_format)
+    success, error, info = download_utils.download_with_ytdlp(URL, "/nonexistent", "temp")
+    assert not success
+    assert "--allow-video" in error
+    success, error, info = download_utils.download_with_ytdlp(URL, "/nonexistent", "temp", allow_video=True)
+    assert "--allow-video" not in error
@@ -0,0 +1,59 @@
+from helpers.download_utils import select_audio_format
+
+def audio(format_id, abr, acodec='opus', **extra):
+    return {'format_id': format_id, 'abr': abr, 'acodec': acodec, 'vcodec': 'none', **extra}
+
+def video(format_id, tbr, acodec='mp4a.40.2'):
+    return {'format_id': format_id, 'tbr': tbr, 'acodec': acodec, 'vcodec': 'avc1.64001F'}
+
+def test_picks_smallest_stream_meeting_codec_adjusted_target():
+    formats = [audio('249', 50), audio('250', 70), audio('251', 135), audio('140', 129, 'mp4a.40.2'),
+               audio('flac', 900, 'flac')]
+    # 192 kbps MP3 needs ~128 kbps of Opus/AAC, so the 900 kbps stream is never fetched
+    assert select_audio_format(formats, 192)['format_id'] == '140'
+
+def test_mp3_sources_are_compared_at_face_value():
+    formats = [audio('low', 160, 'mp3'), audio('high', 256, 'mp3')]
+    assert select_audio_format(formats, 192)['format_id'] == 'high'
+
+def test_falls_back_to_best_when_nothing_reaches_target():
+    formats = [audio('249', 50), audio('250', 70)]
+    assert select_audio_format(formats, 192)['format_id'] == '250'
+
+def test_original_language_beats_smaller_dubbed_track():
+    formats = [
+        audio('251-0', 130, language_preference=-1, format_note='German, medium'),
+        audio('251-1', 140, language_preference=10, format_note='English (United States) original (default), medium'),
+        audio('140-0', 129, 'mp4a.40.2', language_preference=-1, format_note='German, medium'),
+    ]
+    assert select_audio_format(formats, 192)['format_id'] == '251-1'
+
+def test_original_note_breaks_tie_without_language_preference():
+    formats = [audio('dub', 130, format_note='French dubbed'), audio('orig', 140, format_note='English original')]
+    assert select_audio_format(formats, 192)['format_id'] == 'orig'
+
+def test_non_drc_preferred_over_smaller_drc():
+    formats = [audio('251-drc', 129, format_note='medium, DRC'), audio('251', 135, format_note='medium')]
+    assert select_audio_format(formats, 192)['format_id'] == '251'
+
+def test_drc_used_when_it_is_the_only_option():
+    formats = [audio('251-drc', 129, format_note='medium, DRC')]
+    assert select_audio_format(formats, 192)['format_id'] == '251-drc'
+
+def test_drm_formats_are_skipped():
+    formats = [audio('drm', 130, has_drm=True), audio('ok', 60)]
+    assert select_audio_format(formats, 192)['format_id'] == 'ok'
+
+def test_video_refused_unless_allowed():
+    formats = [video('18', 500), {'format_id': '137', 'tbr': 4000, 'acodec': 'none', 'vcodec': 'avc1'}]
+    assert select_audio_format(formats, 192) is None
+    assert select_audio_format(formats, 192, allow_video=True)['format_id'] == '18'
+
+def test_unknown_codecs_accepted_when_nothing_else_qualifies():
+    formats = [{'format_id': 'http-200', 'abr': 200}, {'format_id': 'hls', 'tbr': 300, 'vcodec': None},
+               {'format_id': 'video-only', 'tbr': 900, 'acodec': 'none'}]
+    assert select_audio_format(formats, 192)['format_id'] == 'http-200'
+
+def test_known_audio_only_preferred_over_unknown_codecs():
+    formats = [{'format_id': 'mystery', 'tbr': 300}, audio('251', 135)]
+    assert select_audio_format(formats, 192)['format_id'] == '251'
@@ -0,0 +1,57 @@
+import os
+import pandas as pd
+from helpers.library_utils import LibraryIndex, reconcile_plan
+from helpers.plan_utils import build_download_plan
+from helpers.manifest_utils import record_row, prune_removed_rows
+
+def make_library(tmp_path, names):
+    for name in names:
+        path = os.path.join(tmp_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+    return LibraryIndex(str(tmp_path))
+
+def matched_name(index, title, artist):
+    file_path, score = index.match(title, artist)
+    return os.path.basename(file_path) if file_path else None
+
+def test_exact_file_name_matches(tmp_path):
+    index = make_library(tmp_path, ["Pop/Love Story (Taylor Swift).mp3", "Rock/Yellow (Coldplay).mp3"])
+    assert matched_name(index, "Love Story", "Taylor Swift") == "Love Story (Taylor Swift).mp3"
+
+def test_same_title_different_artist_does_not_match(tmp_path):
+    index = make_library(tmp_path, ["Pop/Hallelujah (Leonard Cohen).mp3"])
+    assert matched_name(index, "Hallelujah", "Jeff Buckley") is None
+
+def test_apostrophes_are_ignored(tmp_path):
+    index = make_library(tmp_path, ["Rock/Dont Stop Me Now (Queen).mp3"])
+    assert matched_name(index, "Don't Stop Me Now", "Queen") == "Dont Stop Me Now (Queen).mp3"
+
+def test_noise_words_in_file_names_are_ignored(tmp_path):
+    index = make_library(tmp_path, ["Imports/Coldplay - Yellow (Official Audio) HD.mp3"])
+    assert matched_name(index, "Yellow", "Coldplay") == "Coldplay - Yellow (Official Audio) HD.mp3"
+
+def test_subset_title_does_not_match_longer_title(tmp_path):
+    index = make_library(tmp_path, ["Pop/Love Story (Taylor Swift).mp3"])
+    assert matched_name(index, "Story", "Taylor Swift") is None
+
+def test_empty_title_or_artist_never_matches(tmp_path):
+    index = make_library(tmp_path, ["Pop/Official Video (Artist).mp3"])
+    assert index.match("Official Video", "Artist") == (None, 0.0)
+
+def test_reconciled_rows_are_present_and_never_pruned(tmp_path):
+    library_file = os.path.join(tmp_path, "Old", "Queen - Dont Stop Me Now.mp3")
+    index = make_library(tmp_path, ["Old/Queen - Dont Stop Me Now.mp3"])
+    df = pd.DataFrame([["Don't Stop Me Now", "Queen", "", "Rock"], ["Unknown Song", "Nobody", "", "Rock"]],
+                      columns=['Title', 'Artist', 'YouTube Link', 'Genre'])
+    plan = build_download_plan(df, str(tmp_path))
+
+    assert reconcile_plan(plan, index, log=lambda msg: None) == 1
+    assert list(plan['action']) == ['present', 'search']
+    assert plan.at[0, 'output_path'] == library_file
+
+    # download_music records present rows as not downloaded, so removing the row keeps the file
+    entries = {}
+    record_row(entries, plan.at[0, 'hash'], "Don't Stop Me Now", "Queen", plan.at[0, 'output_path'])
+    assert prune_removed_rows(entries, set(), set(), log=lambda msg: None) == 0
+    assert os.path.exists(library_file)
@@ -0,0 +1,48 @@
+import os
+import pandas as pd
+from helpers.manifest_utils import record_row, sheet_entries, prune_removed_rows
+from helpers.download_utils import prune_sheet_rows
+from helpers.plan_utils import build_download_plan
+
+def make_plan(rows, download_folder):
+    df = pd.DataFrame(rows, columns=['Title', 'Artist', 'YouTube Link', 'Genre'])
+    return build_download_plan(df, download_folder)
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return path
+
+def test_prune_deletes_downloaded_file_of_removed_row(tmp_path):
+    song = touch(os.path.join(tmp_path, "Pop", "Song (Artist).mp3"))
+    entries = {}
+    record_row(entries, "old", "Song", "Artist", song, downloaded=True)
+
+    assert prune_removed_rows(entries, set(), set()) == 1
+    assert not os.path.exists(song)
+    assert entries == {}
+
+def test_prune_keeps_files_it_did_not_download(tmp_path):
+    library_file = touch(os.path.join(tmp_path, "Old", "Song - Artist.mp3"))
+    entries = {}
+    record_row(entries, "present", "Song", "Artist", library_file)
+
+    assert prune_removed_rows(entries, set(), set()) == 0
+    assert os.path.exists(library_file)
+
+def test_prune_keeps_files_used_by_another_workbook(tmp_path):
+    folder = str(tmp_path)
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    plan_a = make_plan([["Song", "Artist", url, "Pop"]], folder)
+    plan_b = make_plan([["Song", "Artist", url, "Pop"]], folder)
+    song = touch(plan_a.at[0, 'output_path'])
+
+    manifest = {'version': 1, 'sheets': {}}
+    record_row(sheet_entries(manifest, "a.xlsx"), plan_a.at[0, 'hash'], "Song", "Artist", song, downloaded=True)
+    record_row(sheet_entries(manifest, "b.xlsx"), plan_b.at[0, 'hash'], "Song", "Artist", song, downloaded=True)
+
+    # The row is removed from a.xlsx but b.xlsx still has it
+    emptied = make_plan([["Other", "Artist", "", "Pop"]], folder)
+    assert prune_sheet_rows(emptied, manifest, "a.xlsx", log=lambda msg: None) == 0
+    assert os.path.exists(song)
+    assert sheet_entries(manifest, "a.xlsx") == {}
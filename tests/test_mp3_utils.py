@@ -0,0 +1,78 @@
+import os
+from helpers.mp3_utils import verify_mp3, audit_library
+from helpers.manifest_utils import record_row, sheet_entries, recorded_durations
+
+# MPEG-1 Layer III, no CRC, 128 kbps, 44.1 kHz, joint stereo, no padding
+HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+FRAME_LENGTH = 144 * 128000 // 44100  # 417 bytes
+FRAME_SECONDS = 1152 / 44100
+
+def frame(body=b""):
+    payload = HEADER + body
+    return payload + b"\x00" * (FRAME_LENGTH - len(payload))
+
+def xing_frame(frame_count):
+    # Side info for MPEG-1 stereo is 32 bytes, so the tag starts right after it
+    return frame(b"\x00" * 32 + b"Xing" + (1).to_bytes(4, 'big') + frame_count.to_bytes(4, 'big'))
+
+def write(tmp_path, name, data):
+    path = os.path.join(tmp_path, name)
+    with open(path, 'wb') as mp3_file:
+        mp3_file.write(data)
+    return path
+
+def test_clean_file(tmp_path):
+    path = write(tmp_path, "clean.mp3", xing_frame(100) + frame() * 100)
+    ok, problem, duration = verify_mp3(path)
+    assert ok, problem
+    assert abs(duration - 100 * FRAME_SECONDS) < 1e-6
+
+def test_file_cut_mid_frame(tmp_path):
+    path = write(tmp_path, "cut.mp3", (frame() * 100)[:-200])
+    ok, problem, duration = verify_mp3(path)
+    assert not ok
+    assert problem == "Last frame is cut off"
+
+def test_xing_frame_count_exceeds_frames_present(tmp_path):
+    path = write(tmp_path, "short.mp3", xing_frame(200) + frame() * 100)
+    ok, problem, duration = verify_mp3(path)
+    assert not ok
+    assert problem == "Only 100 of 200 frames present"
+
+def test_id3_prefixed_file(tmp_path):
+    # 100-byte tag body with sync-like bytes that must not be mistaken for audio
+    id3 = b"ID3\x04\x00\x00" + bytes([0, 0, 0, 100]) + b"\xff\xfb" * 50
+    path = write(tmp_path, "tagged.mp3", id3 + frame() * 50 + b"TAG" + b"\x00" * 125)
+    ok, problem, duration = verify_mp3(path)
+    assert ok, problem
+    assert abs(duration - 50 * FRAME_SECONDS) < 1e-6
+
+def test_empty_file(tmp_path):
+    path = write(tmp_path, "empty.mp3", b"")
+    assert verify_mp3(path) == (False, "File is empty", 0.0)
+
+def test_not_an_mp3(tmp_path):
+    path = write(tmp_path, "junk.mp3", b"<html>Sign in to confirm you're not a bot</html>" * 20)
+    ok, problem, duration = verify_mp3(path)
+    assert not ok
+    assert problem == "No MPEG audio frames found"
+
+def test_duration_mismatch(tmp_path):
+    path = write(tmp_path, "clip.mp3", frame() * 100)  # About 2.6 s
+    ok, problem, duration = verify_mp3(path, expected_duration=60)
+    assert not ok
+    assert problem.startswith("Duration 3s does not match expected 60s")
+    assert verify_mp3(path, expected_duration=3)[0]
+
+def test_audit_uses_recorded_durations(tmp_path):
+    good = write(tmp_path, "good.mp3", frame() * 100)
+    clipped = write(tmp_path, "clipped.mp3", frame() * 100)
+    manifest = {'version': 1, 'sheets': {}}
+    entries = sheet_entries(manifest, "music.xlsx")
+    record_row(entries, "a", "Good", "Artist", good, True, "https://youtu.be/aaaaaaaaaaa")
+    record_row(entries, "b", "Clipped", "Artist", clipped, True, "https://youtu.be/bbbbbbbbbbb")
+    durations = {"https://youtu.be/aaaaaaaaaaa": 2.6, "https://youtu.be/bbbbbbbbbbb": 240}
+
+    expected = recorded_durations(manifest, durations.get)
+    bad = audit_library(str(tmp_path), expected, max_workers=1, log=lambda msg: None)
+    assert [os.path.basename(path) for path, problem, duration in bad] == ["clipped.mp3"]
@@ -0,0 +1,26 @@
+import pandas as pd
+from helpers.plan_utils import extract_video_id, build_download_plan, set_plan_link
+from helpers.cache_utils import cache_key
+
+def test_extract_video_id_link_forms():
+    for url in ["https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10", "https://youtu.be/dQw4w9WgXcQ",
+                "https://youtube.com/shorts/dQw4w9WgXcQ", "https://www.youtube.com/embed/dQw4w9WgXcQ"]:
+        assert extract_video_id(url) == "dQw4w9WgXcQ"
+    assert extract_video_id("https://soundcloud.com/artist/song") is None
+
+def test_plan_and_cache_agree_on_video_id():
+    url = "https://youtu.be/dQw4w9WgXcQ"
+    df = pd.DataFrame([["Song", "Artist", url, "Pop"]], columns=['Title', 'Artist', 'YouTube Link', 'Genre'])
+    plan = build_download_plan(df, "/music")
+    assert plan.at[0, 'video_id'] == cache_key(url) == "dQw4w9WgXcQ"
+
+def test_set_plan_link_updates_row():
+    df = pd.DataFrame([["Song", "Artist", "", "Pop"]], columns=['Title', 'Artist', 'YouTube Link', 'Genre'])
+    plan = build_download_plan(df, "/music")
+    old_hash = plan.at[0, 'hash']
+    set_plan_link(plan, 0, "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    assert plan.at[0, 'action'] == 'download'
+    assert plan.at[0, 'video_id'] == "dQw4w9WgXcQ"
+    assert plan.at[0, 'hash'] != old_hash
+    set_plan_link(plan, 0, "SKIPPED")
+    assert (plan.at[0, 'action'], plan.at[0, 'video_id']) == ('skip', '')
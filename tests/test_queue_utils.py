@@ -0,0 +1,108 @@
+import os
+import time
+import multiprocessing
+from helpers import queue_utils, schedule_utils
+from helpers.queue_utils import WorkQueue, run_worker
+
+def fake_download_song(url, title, artist, genre, download_folder, add_metadata_func, log=print, allow_video=False):
+    """Stands in for download_song: writes a placeholder file instead of fetching the video"""
+    genre_folder = os.path.join(download_folder, genre)
+    os.makedirs(genre_folder, exist_ok=True)
+    output_path = os.path.join(genre_folder, f"{title} ({artist}).mp3")
+    time.sleep(0.05)  # Long enough for the workers to interleave
+    with open(output_path, 'wb') as mp3_file:
+        mp3_file.write(url.encode('utf-8'))
+    return 'downloaded', output_path
+
+def no_metadata(file_path, title, artist):
+    pass
+
+def worker_process(queue_path, download_folder, worker_id):
+    schedule_utils.download_song = fake_download_song
+    run_worker(queue_path, download_folder, worker_id, lease_seconds=1, poll_interval=0.1,
+               add_metadata_func=no_metadata, log=lambda msg: None)
+
+def make_job(key, sheet, row_index, title):
+    target = {'sheet': sheet, 'row_index': row_index, 'title': title, 'artist': 'Artist', 'genre': 'Pop',
+              'output_path': None}
+    return {'key': key, 'url': f"https://www.youtube.com/watch?v={key}", 'targets': [target],
+            'priority': 0, 'sheet_order': 0, 'sheet_rank': row_index, 'duration': None}
+
+def test_workers_finish_every_job_and_take_over_crashed_lease(tmp_path):
+    queue_path = str(tmp_path / "queue.db")
+    download_folder = str(tmp_path / "library")
+    keys = [f"video{n:06d}" for n in range(12)]
+    queue = WorkQueue(queue_path)
+    queue.enqueue([make_job(key, "a.xlsx", n, f"Song {n}") for n, key in enumerate(keys)])
+
+    # A worker that claims a job and dies without reporting back
+    crashed_job_id, _ = queue.claim("crashed", lease_seconds=0.5)
+
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=worker_process, args=(queue_path, download_folder, f"worker{n}"))
+               for n in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert queue.counts() == {'done': len(keys)}
+    worker_id, attempts = queue.conn.execute(
+        "SELECT worker, attempts FROM jobs WHERE id = ?", (crashed_job_id,)
+    ).fetchone()
+    assert worker_id != "crashed"
+    assert attempts == 2
+    assert len(os.listdir(os.path.join(download_folder, "Pop"))) == len(keys)
+    queue.close()
+
+def test_job_whose_lease_keeps_expiring_is_failed(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([make_job("video000001", "a.xlsx", 0, "Song")])
+    for attempt in range(queue_utils.MAX_ATTEMPTS):
+        assert queue.claim(f"crashed{attempt}", lease_seconds=0) is not None
+        time.sleep(0.01)
+
+    # The last crash used up the attempts, so nothing is handed out again
+    assert queue.claim("worker") is None
+    assert queue.counts() == {'failed': 1}
+    assert queue.row_results() == {"a.xlsx": {0: f"Failed: Lease expired {queue_utils.MAX_ATTEMPTS} times"}}
+    queue.close()
+
+def test_enqueue_requeues_failed_jobs(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([make_job("video000001", "a.xlsx", 0, "Song")])
+    for attempt in range(queue_utils.MAX_ATTEMPTS):
+        job_id, _ = queue.claim("worker")
+        queue.fail(job_id, "worker", "HTTP Error 403")
+    assert queue.counts() == {'failed': 1}
+
+    assert queue.enqueue([make_job("video000001", "a.xlsx", 0, "Song")]) == 1
+    assert queue.counts() == {'queued': 1}
+    assert queue.claim("worker") is not None
+    queue.close()
+
+def test_enqueue_merges_new_rows_into_existing_job(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([make_job("video000001", "a.xlsx", 0, "Song")])
+    job_id, job = queue.claim("worker")
+    queue.complete(job_id, "worker", {("a.xlsx", 0): "Downloaded"})
+
+    # A row for the same video is added to another workbook later
+    assert queue.enqueue([make_job("video000001", "b.xlsx", 3, "Song")]) == 1
+    job_id, job = queue.claim("worker")
+    assert {(t['sheet'], t['row_index']) for t in job['targets']} == {("a.xlsx", 0), ("b.xlsx", 3)}
+    queue.complete(job_id, "worker", {("a.xlsx", 0): "Exists", ("b.xlsx", 3): "Copied"})
+
+    assert queue.row_results() == {"a.xlsx": {0: "Exists"}, "b.xlsx": {3: "Copied"}}
+    queue.close()
+
+def test_job_merged_while_leased_runs_again_for_new_rows(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([make_job("video000001", "a.xlsx", 0, "Song")])
+    job_id, _ = queue.claim("worker")
+    queue.enqueue([make_job("video000001", "b.xlsx", 3, "Song")])
+
+    assert queue.complete(job_id, "worker", {("a.xlsx", 0): "Downloaded"})
+    assert queue.counts() == {'queued': 1}
+    queue.close()
@@ -0,0 +1,155 @@
+import os
+import openpyxl
+import pytest
+from helpers.download_utils import read_music_sheet, STATUS_COLUMN
+from helpers import schedule_utils
+from helpers.schedule_utils import build_jobs, order_jobs, run_job, write_sheet_results
+
+URL_A = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+URL_B = "https://www.youtube.com/watch?v=bbbbbbbbbbb"
+
+def make_workbook(path, rows, extra_sheet=True):
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    for row in rows:
+        worksheet.append(row)
+    if extra_sheet:
+        workbook.create_sheet("Notes").append(["keep me"])
+    workbook.save(path)
+    return str(path)
+
+def sheet_rows(path):
+    workbook = openpyxl.load_workbook(path)
+    return [list(row) for row in workbook.worksheets[0].iter_rows(values_only=True)], workbook.sheetnames
+
+def test_headerless_two_link_layout_is_preserved(tmp_path):
+    rows = [["Song A", "Artist", URL_A, "Pop", None],
+            ["Song B", "Artist", None, "Rock", URL_B]]
+    path = make_workbook(tmp_path / "headerless.xlsx", rows)
+
+    assert write_sheet_results(path, {0: "Downloaded", 1: "Failed: HTTP Error 403"}) == (True, None)
+
+    written, sheet_names = sheet_rows(path)
+    assert written == [rows[0] + ["Downloaded"], rows[1] + ["Failed: HTTP Error 403"]]
+    assert sheet_names == ["Sheet", "Notes"]
+
+    # The status column is not mistaken for a link column on the next read
+    df, error = read_music_sheet(path, log=lambda msg: None)
+    assert list(df['YouTube Link']) == [URL_A, URL_B]
+
+    # A second run reuses the same column
+    write_sheet_results(path, {1: "Downloaded"})
+    written, _ = sheet_rows(path)
+    assert written[1] == rows[1] + ["Downloaded"]
+
+def test_headerless_four_columns_stay_four_on_read(tmp_path):
+    path = make_workbook(tmp_path / "four.xlsx", [["Song", "Artist", None, "Pop"]])
+    write_sheet_results(path, {0: "Needs search"})
+    df, error = read_music_sheet(path, log=lambda msg: None)
+    assert error is None
+    assert df.shape == (1, 4)
+
+def test_header_layout_gets_status_column(tmp_path):
+    rows = [["Title", "Artist", "YouTube Link", "Genre", "Notes"],
+            ["Song A", "Artist", URL_A, "Pop", "live version"]]
+    path = make_workbook(tmp_path / "headers.xlsx", rows)
+
+    write_sheet_results(path, {0: "Exists"})
+    written, sheet_names = sheet_rows(path)
+    assert written == [rows[0] + [STATUS_COLUMN], rows[1] + ["Exists"]]
+    assert sheet_names == ["Sheet", "Notes"]
+
+def test_priority_by_file_name_from_any_directory(tmp_path, monkeypatch):
+    first = make_workbook(tmp_path / "first.xlsx", [["Song A", "Artist", URL_A, "Pop"]], extra_sheet=False)
+    second = make_workbook(tmp_path / "second.xlsx", [["Song B", "Artist", URL_B, "Pop"]], extra_sheet=False)
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    jobs, _ = build_jobs([first, second], str(tmp_path / "library"), {"second.xlsx": -1, first: 5},
+                         log=lambda msg: None)
+    assert {job['key']: job['priority'] for job in jobs} == {"aaaaaaaaaaa": 5, "bbbbbbbbbbb": -1}
+
+def test_non_youtube_links_become_jobs(tmp_path):
+    url = "https://soundcloud.com/artist/song"
+    sheet = make_workbook(tmp_path / "mixed.xlsx", [["Title", "Artist", "YouTube Link", "Genre"],
+                                                    ["Song", "Artist", url, "Pop"],
+                                                    ["Other", "Artist", None, "Pop"]], extra_sheet=False)
+    jobs, row_statuses = build_jobs([sheet], str(tmp_path / "library"), log=lambda msg: None)
+    assert [(job['key'], job['url']) for job in jobs] == [(url, url)]
+    assert row_statuses[sheet] == {1: "Needs search"}
+
+def make_job(key, priority=0, sheet_order=0, sheet_rank=0, duration=None):
+    return {'key': key, 'url': f"https://www.youtube.com/watch?v={key}", 'targets': [],
+            'priority': priority, 'sheet_order': sheet_order, 'sheet_rank': sheet_rank, 'duration': duration}
+
+def two_sheet_jobs():
+    # Sheet 0 (priority 1) has three rows, sheet 1 (priority 0) has two
+    return [make_job("a0", 1, 0, 0), make_job("a1", 1, 0, 1), make_job("a2", 1, 0, 2),
+            make_job("b0", 0, 1, 0), make_job("b1", 0, 1, 1)]
+
+def keys(jobs):
+    return [job['key'] for job in jobs]
+
+def test_priority_policy_runs_lower_priority_first():
+    assert keys(order_jobs(two_sheet_jobs(), 'priority')) == ["b0", "b1", "a0", "a1", "a2"]
+
+def test_round_robin_policy_alternates_sheets():
+    assert keys(order_jobs(two_sheet_jobs(), 'round_robin')) == ["b0", "a0", "b1", "a1", "a2"]
+
+def test_shortest_policy_puts_unknown_durations_last():
+    durations = {"https://www.youtube.com/watch?v=a1": 300, "https://www.youtube.com/watch?v=b0": 120,
+                 "https://www.youtube.com/watch?v=b1": 200}
+    jobs = two_sheet_jobs()
+    jobs[0]['duration'] = 250  # Already known from the sheet's metadata
+    ordered = order_jobs(jobs, 'shortest', durations.get)
+    assert keys(ordered) == ["b0", "b1", "a0", "a1", "a2"]
+    assert ordered[-1]['duration'] is None
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        order_jobs(two_sheet_jobs(), 'fastest')
+
+def test_same_video_across_sheets_becomes_one_job(tmp_path):
+    header = ["Title", "Artist", "YouTube Link", "Genre"]
+    first = make_workbook(tmp_path / "first.xlsx", [header, ["Song A", "Artist", URL_A, "Pop"]], extra_sheet=False)
+    second = make_workbook(tmp_path / "second.xlsx", [header,
+                                                      ["Song A", "Artist", "https://youtu.be/aaaaaaaaaaa", "Rock"],
+                                                      ["Song A", "Artist", URL_B, "Pop"]], extra_sheet=False)
+
+    jobs, row_statuses = build_jobs([first, second], str(tmp_path / "library"), log=lambda msg: None)
+
+    assert keys(jobs) == ["aaaaaaaaaaa"]
+    assert [(t['sheet'], t['row_index'], t['genre']) for t in jobs[0]['targets']] == [
+        (first, 0, "Pop"), (second, 0, "Rock")]
+    # A different video that would land on a path already claimed is not downloaded again
+    assert row_statuses[second] == {1: "Duplicate"}
+
+def test_run_job_downloads_once_and_copies_to_other_targets(tmp_path, monkeypatch):
+    download_folder = str(tmp_path)
+    downloads = []
+
+    def fake_download_song(url, title, artist, genre, download_folder, add_metadata_func, log=print,
+                           allow_video=False):
+        downloads.append(url)
+        output_path = os.path.join(download_folder, genre, f"{title} ({artist}).mp3")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as mp3_file:
+            mp3_file.write(b"audio")
+        return 'downloaded', output_path
+
+    monkeypatch.setattr(schedule_utils, "download_song", fake_download_song)
+    existing = os.path.join(download_folder, "Jazz", "Song (Artist).mp3")
+    os.makedirs(os.path.dirname(existing))
+    open(existing, 'wb').close()
+
+    job = make_job("aaaaaaaaaaa")
+    job['targets'] = [{'sheet': "a.xlsx", 'row_index': row_index, 'title': "Song", 'artist': "Artist", 'genre': genre}
+                      for row_index, genre in enumerate(["Pop", "Rock", "Jazz"])]
+    tagged = []
+    results = run_job(job, download_folder, lambda path, title, artist: tagged.append(path), log=lambda msg: None)
+
+    assert downloads == [job['url']]
+    assert results == {("a.xlsx", 0): "Downloaded", ("a.xlsx", 1): "Copied", ("a.xlsx", 2): "Exists"}
+    copy = os.path.join(download_folder, "Rock", "Song (Artist).mp3")
+    with open(copy, 'rb') as mp3_file:
+        assert mp3_file.read() == b"audio"
+    assert tagged == [copy]
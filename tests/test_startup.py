@@ -0,0 +1,8 @@
+from startup_benchmark import HEAVY_MODULES, measure_import_time, check_startup_budget
+
+def test_gui_startup_does_not_import_heavy_modules():
+    total_ms, imported = measure_import_time()
+    assert [module for module in HEAVY_MODULES if module in imported] == []
+
+def test_gui_startup_within_budget():
+    assert check_startup_budget() == []